@@ -1,18 +1,33 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file
+import time
+_import_started = time.perf_counter()  # Untuk ukur waktu import app (lihat /health/ready)
+
+from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file, Response, stream_with_context, jsonify
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from pymongo import MongoClient
+from pymongo import ReturnDocument
 from bson.objectid import ObjectId
-from gridfs import GridFS
-import bcrypt
+from werkzeug.wsgi import wrap_file
+from images import IMAGE_SIZES, IMAGE_FORMATS, store_image, find_variant, delete_image
+import assets
+import batch_stats
+import bulk
+import metrics
+import catalog
+import kelas_api
+from page_cache import cached_page
+import page_cache
+import placement
+import queries
+from cache import TTLCache
+from mongo import mongo, db, fs
+from indexes import ensure_indexes
+from login_guard import create_login_guard
 from dotenv import load_dotenv
 import os
-import io
 from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from flask import send_from_directory
-import pandas as pd
+import csv
+import json
+import tempfile
 from io import StringIO
 
 # Load environment variables
@@ -27,55 +42,112 @@ app.secret_key = os.getenv('SECRET_KEY', 'your_default_secret_key_here')
 # print(f"EMAIL_PASSWORD: {os.getenv('EMAIL_PASSWORD')}")
 # print(f"EMAIL_RECIPIENT: {os.getenv('EMAIL_RECIPIENT')}")
 
+# Asset statis ber-hash dari build_assets.py (url_for('static') di template di-override)
+assets.init_app(app)
+
+# Server-Timing, /metrics dan log request lambat (lihat metrics.py)
+metrics.init_app(app)
+
 # Session config
 app.config['SESSION_PERMANENT'] = False
 app.config['PERMANENT_SESSION_LIFETIME'] = 3600
 
-# MongoDB
+# MongoDB: client dibuat lazy per proses setelah fork (lihat mongo.py)
 app.config['MONGO_URI'] = os.getenv('MONGO_URI')
-mongo_client = MongoClient(app.config['MONGO_URI'])
-db = mongo_client['genkan_institute']
-fs = GridFS(db)  # GridFS for images
-
-# Email configuration
-EMAIL_USERNAME = os.getenv('EMAIL_USERNAME')
-EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
-EMAIL_RECIPIENT = os.getenv('EMAIL_RECIPIENT')
-
-if not all([EMAIL_USERNAME, EMAIL_PASSWORD, EMAIL_RECIPIENT]):
-    print("Warning: One or more email configuration variables are missing!")
+mongo.uri = app.config['MONGO_URI']
+mongo.on_connect(ensure_indexes)  # Sekali per proses, no-op kalau versi index sudah terbaru
+mongo.on_connect(batch_stats.ensure_stats)  # Bangun counter dashboard di database lama
 
 # Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'admin_login'  # HANYA ADMIN
+login_guard = create_login_guard(db)
 
 class User(UserMixin):
     def __init__(self, id, username):
         self.id = str(id)
         self.username = username
 
-@login_manager.user_loader
-def load_user(user_id):
-    admin = db.admins.find_one({"_id": ObjectId(user_id)})
+# load_user dipanggil di setiap request admin; identitas admin di-cache
+# supaya tidak query db.admins terus. Perubahan admin dari luar app
+# (mis. admin.py) terlihat paling lambat setelah TTL.
+user_cache = TTLCache(ttl=int(os.getenv('USER_CACHE_TTL', 300)), maxsize=256)
+
+def fetch_user(user_id):
+    admin = db.admins.find_one({"_id": ObjectId(user_id)}, {"username": 1})
     if admin:
         return User(admin['_id'], admin['username'])
     return None
 
+@login_manager.user_loader
+def load_user(user_id):
+    return user_cache.get_or_load(user_id, lambda: fetch_user(user_id))
+
+# Gambar di GridFS tidak pernah diubah setelah ditulis (ganti gambar = file baru),
+# jadi aman di-cache selamanya oleh browser/CDN.
+IMAGE_CACHE_MAX_AGE = 31536000
+
+@app.template_global()
+def image_srcset(item, format='jpeg'):
+    """srcset untuk varian gambar kelas, kosong kalau belum ada varian."""
+    variants = item.get('image_variants') or {}
+    # Original yang lebih sempit dari varian terkecil tidak diperbesar, jadi beberapa
+    # varian bisa sama lebarnya; satu kandidat per lebar supaya srcset tetap valid
+    widths = {}
+    for size, width in variants.items():
+        widths.setdefault(width, size)
+    return ', '.join(
+        f"{url_for('serve_image', image_id=item['image_id'], size=size, format=format)} {width}w"
+        for width, size in widths.items()
+    )
+
 @app.route('/image/<image_id>')
 def serve_image(image_id):
+    size = request.args.get('size')
+    fmt = request.args.get('format', 'jpeg')
     try:
-        grid_out = fs.get(ObjectId(image_id))
-        return send_file(io.BytesIO(grid_out.read()), mimetype=grid_out.content_type, download_name=grid_out.filename)
+        with metrics.timed('gridfs'):
+            grid_out = None
+            if size in IMAGE_SIZES and fmt in IMAGE_FORMATS:
+                grid_out = find_variant(fs, image_id, size, fmt)
+            exact = grid_out is not None or size is None
+            if grid_out is None:
+                grid_out = fs.get(ObjectId(image_id))
     except Exception as e:
         print(f"Image serve error: {e}")
         return send_file(os.path.join(app.root_path, 'static/image/placeholder.jpg'), mimetype='image/jpeg')
 
+    # Validator: md5 untuk file lama (pymongo < 4), selain itu id + ukuran file
+    etag = getattr(grid_out, 'md5', None) or f"{grid_out._id}-{grid_out.length}"
+
+    # Stream per chunk GridFS, tanpa membaca seluruh file ke memori
+    response = Response(
+        wrap_file(request.environ, grid_out, buffer_size=grid_out.chunk_size),
+        mimetype=grid_out.content_type or 'application/octet-stream',
+        direct_passthrough=True,
+    )
+    response.content_length = grid_out.length
+    response.set_etag(etag)
+    response.last_modified = grid_out.upload_date
+    response.cache_control.public = True
+    if exact:
+        response.cache_control.max_age = IMAGE_CACHE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Fallback ke original (gambar lama tanpa varian): jangan dikunci selamanya
+        response.cache_control.max_age = 3600
+    if grid_out.filename:
+        response.headers.set('Content-Disposition', 'inline', filename=grid_out.filename)
+    # 304 untuk If-None-Match/If-Modified-Since, 206 untuk Range
+    return response.make_conditional(request, accept_ranges=True, complete_length=grid_out.length)
+
 @app.route('/')
+@cached_page(db)
 def index():
     try:
         # Tampilkan hanya 3 kelas unggulan (upcoming/ongoing terbaru)
-        schedules = list(db.kelas.find({"status": {"$in": ["upcoming", "ongoing"]}}).sort("start_date", 1).limit(3))
+        schedules = catalog.featured_classes(db)
     except Exception as e:
         print(f"DB Error: {e}")
         flash("Gagal memuat jadwal kelas.", "error")
@@ -83,58 +155,76 @@ def index():
     return render_template('index.html', schedules=schedules)
 
 @app.route('/kelas')
+@cached_page(db)
 def kelas():
+    # Halaman pertama saja; sisanya dimuat dari /api/kelas dengan next_cursor
+    next_cursor = None
     try:
-        schedules = list(db.kelas.find().sort("start_date", 1))
+        schedules = catalog.all_classes(db)
+        if len(schedules) > kelas_api.API_PAGE_SIZE:
+            schedules = schedules[:kelas_api.API_PAGE_SIZE]
+            next_cursor = kelas_api.encode_cursor(schedules[-1])
     except Exception as e:
         flash("Gagal memuat kelas.", "error")
         schedules = []
-    return render_template('kelas.html', schedules=schedules)
+    return render_template('kelas.html', schedules=schedules, next_cursor=next_cursor)
+
+@app.route('/api/kelas')
+def api_kelas():
+    try:
+        query, fields, limit = kelas_api.parse_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        docs, next_cursor = kelas_api.fetch_page(db, query, fields, limit)
+    except Exception as e:
+        print(f"API kelas error: {e}")
+        return jsonify({"error": "Gagal memuat kelas."}), 503
+    body, etag = kelas_api.encode_json({
+        "items": [kelas_api.serialize(doc, fields, url_for) for doc in docs],
+        "next_cursor": next_cursor,
+    })
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag, weak=True)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    response = response.make_conditional(request)
+    # gzip setelah cek 304, jadi revalidasi tidak perlu kompresi
+    if response.status_code == 200 and len(body) >= kelas_api.GZIP_MIN_BYTES \
+            and 'gzip' in request.accept_encodings:
+        response.set_data(kelas_api.gzip_body(body))
+        response.content_encoding = 'gzip'
+    return response
 
 @app.route('/tentang')
+@cached_page()
 def tentang():
     return render_template('tentang.html')
 
 @app.route('/pengajar')
+@cached_page()
 def pengajar():
     return render_template('pengajar.html')
 
+def kontak_document(form):
+    # Disimpan ke outbox; email dikirim oleh mail_worker.py di luar request
+    now = datetime.utcnow()
+    return {
+        "nama": form.get('nama'),
+        "email": form.get('email'),
+        "pesan": form.get('pesan'),
+        "tanggal": now,
+        "mail_status": "pending",
+        "mail_attempts": 0,
+        "next_attempt_at": now
+    }
+
 @app.route('/kontak', methods=['GET', 'POST'])
 def kontak():
     if request.method == 'POST':
-        nama = request.form.get('nama')
-        email = request.form.get('email')
-        pesan = request.form.get('pesan')
         try:
-            # Save to MongoDB
-            db.kontak.insert_one({
-                "nama": nama,
-                "email": email,
-                "pesan": pesan,
-                "tanggal": datetime.utcnow()
-            })
-
-            # Send email
-            msg = MIMEMultipart()
-            msg['From'] = EMAIL_USERNAME
-            msg['To'] = EMAIL_RECIPIENT
-            msg['Subject'] = f'New Contact Form Submission from {nama}'
-            body = f"""
-            New message from contact form:
-            Name: {nama}
-            Email: {email}
-            Message: {pesan}
-            Submitted on: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}
-            """
-            msg.attach(MIMEText(body, 'plain'))
-
-            # Connect to Gmail's SMTP server
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-            server.sendmail(EMAIL_USERNAME, EMAIL_RECIPIENT, msg.as_string())
-            server.quit()
-
+            db.kontak.insert_one(kontak_document(request.form))
             flash("Pesan terkirim! Kami akan balas secepatnya.", "success")
             return redirect(url_for('kontak'))
         except Exception as e:
@@ -142,6 +232,40 @@ def kontak():
             flash(f"Gagal mengirim pesan: {str(e)}", "error")
     return render_template('kontak.html')
 
+def reserve_seat(level, registration):
+    """Ambil satu kursi dan simpan pendaftaran.
+
+    Kursi dikurangi dengan satu operasi atomik bersyarat, jadi pendaftaran
+    paralel tidak bisa overselling. Batch diurutkan dari yang paling awal:
+    kalau batch pertama penuh, otomatis jatuh ke batch berikutnya dengan
+    level yang sama. Return dokumen kelas, atau None kalau semua penuh.
+    """
+    kelas = db.kelas.find_one_and_update(
+        queries.open_seat(level),
+        {"$inc": {"spots_available": -1}},
+        sort=queries.KELAS_SORT,
+        projection={"batch_id": 1, "level": 1, "title": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if kelas is None:
+        return None
+    registration["batch_id"] = kelas.get("batch_id")
+    try:
+        db.registrations.insert_one(registration)
+    except Exception:
+        # Kompensasi: kembalikan kursi kalau pendaftaran gagal disimpan
+        db.kelas.update_one({"_id": kelas["_id"]}, {"$inc": {"spots_available": 1}})
+        raise
+    finally:
+        # Sisa kursi berubah
+        catalog.invalidate()
+    try:
+        batch_stats.record_registration(db, registration["batch_id"], registration.get("status"))
+    except Exception as e:
+        # Pendaftaran sudah tersimpan; selisih counter dibereskan batch_stats.py --rebuild
+        print(f"Batch stats error: {e}")
+    return kelas
+
 @app.route('/daftar', methods=['GET', 'POST'])
 def daftar():
     if request.method == 'POST':
@@ -150,20 +274,15 @@ def daftar():
         whatsapp = request.form.get('whatsapp')  # Tambahkan ini
         level = request.form.get('level')
         try:
-            kelas = db.kelas.find_one({"level": level, "status": "upcoming", "spots_available": {"$gt": 0}})
+            kelas = reserve_seat(level, {
+                "nama": nama,
+                "email": email,
+                "whatsapp": whatsapp,  # Tambahkan ini
+                "level": level,
+                "status": "pending",
+                "tanggal": datetime.utcnow()
+            })
             if kelas:
-                # Kurangi spot available
-                db.kelas.update_one({"_id": kelas["_id"]}, {"$inc": {"spots_available": -1}})
-                # Simpan data pendaftaran
-                db.registrations.insert_one({
-                    "nama": nama,
-                    "email": email,
-                    "whatsapp": whatsapp,  # Tambahkan ini
-                    "level": level,
-                    "status": "pending",
-                    "tanggal": datetime.utcnow(),
-                    "batch_id": kelas.get("batch_id")
-                })
                 # Kirim email konfirmasi (opsional, sesuaikan jika perlu)
                 flash("Pendaftaran berhasil! Kami akan menghubungi Anda.", "success")
                 return redirect(url_for('daftar'))
@@ -173,7 +292,7 @@ def daftar():
             print(f"Pendaftaran error: {e}")
             flash(f"Gagal mendaftar: {str(e)}", "error")
     try:
-        available_levels = list(db.kelas.find({"status": "upcoming", "spots_available": {"$gt": 0}}))
+        available_levels = catalog.available_classes(db)
     except Exception as e:
         flash("Gagal memuat kelas tersedia.", "error")
         available_levels = []
@@ -182,7 +301,7 @@ def daftar():
 @app.route('/kelas/<kelas_id>')
 def kelas_detail(kelas_id):
     try:
-        kelas = db.kelas.find_one({"_id": ObjectId(kelas_id)})
+        kelas = catalog.get_class(db, kelas_id)
         if not kelas:
             flash("Kelas tidak ditemukan.", "error")
             return redirect(url_for('kelas'))
@@ -193,43 +312,66 @@ def kelas_detail(kelas_id):
 
 @app.route('/placement-test', methods=['GET', 'POST'])
 def placement_test():
-    if request.method == 'POST':
-        flash("Hasil: Kamu cocok untuk N5! Daftar kelas sekarang.", "info")
-        return redirect(url_for('kelas'))
-    return render_template('placement_test.html')
+    try:
+        key = placement.answer_key(db)
+    except Exception as e:
+        print(f"Placement bank error: {e}")
+        flash("Soal placement test gagal dimuat.", "error")
+        return render_template('placement_test.html', questions=[], result=None)
+
+    result = None
+    if request.method == 'POST' and len(key):
+        # Kunci jawaban & katalog sudah di memori: penilaian tanpa query selain insert attempt
+        responses = key.responses_from_form(request.form)
+        score, level = placement.grade(key, responses)
+        try:
+            classes = placement.matching_classes(catalog.available_classes(db), level)
+        except Exception as e:
+            print(f"DB Error: {e}")
+            classes = []
+        try:
+            db.placement_attempts.insert_one(placement.attempt_document(
+                key, responses, score, level,
+                nama=request.form.get('nama') or None, email=request.form.get('email') or None
+            ))
+        except Exception as e:
+            print(f"Placement attempt error: {e}")
+        result = {"score": score, "level": level, "classes": classes}
+    return render_template('placement_test.html', questions=key.questions, result=result)
 
 @app.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
     if request.method == 'POST':
-        username = request.form.get('username')
-        password = request.form.get('password').encode('utf-8')  # Konversi input password ke bytes
-        admin = db.admins.find_one({"username": username})
-        if admin:
-            # Ambil hashed password dari database dan konversi ke bytes jika perlu
-            stored_password = admin['password']
-            if isinstance(stored_password, str):
-                # Asumsi password disimpan sebagai string (misalnya base64 atau hex), decode kembali
-                try:
-                    stored_password = stored_password.encode('utf-8')  # Jika string biasa
-                    # Atau jika disimpan sebagai base64: stored_password = base64.b64decode(stored_password)
-                except Exception as e:
-                    flash(f"Error decoding password: {str(e)}", "error")
-                    return render_template('admin_login.html')
-            if admin and bcrypt.checkpw(password, stored_password):
-                user = User(admin['_id'], admin['username'])
-                login_user(user)
-                session.pop('_flashes', None)  # Clear any previous flashes
-                flash('Login berhasil!', 'success')
-                return redirect(url_for('admin_kelas'))
-            else:
-                flash('Username atau password salah.', 'error')
-        else:
-            flash('Username tidak ditemukan.', 'error')
+        username = request.form.get('username') or ''
+        password = (request.form.get('password') or '').encode('utf-8')  # Konversi input password ke bytes
+        # Tolak tebakan beruntun sebelum ada kerja bcrypt sama sekali
+        if not login_guard.allow(request.remote_addr, username):
+            flash('Terlalu banyak percobaan login. Coba lagi beberapa menit lagi.', 'error')
+            return render_template('admin_login.html'), 429
+        admin = db.admins.find_one(queries.admin_by_username(username))
+        # Ambil hashed password dari database dan konversi ke bytes jika perlu
+        stored_password = admin['password'] if admin else None
+        if isinstance(stored_password, str):
+            stored_password = stored_password.encode('utf-8')
+        # Username tidak ada tetap dicek ke hash dummy (waktu respons sama)
+        matched = login_guard.verify(password, stored_password)
+        if matched is None:
+            flash('Server sedang sibuk. Coba lagi sebentar.', 'error')
+            return render_template('admin_login.html'), 503
+        if matched:
+            user = User(admin['_id'], admin['username'])
+            login_user(user)
+            user_cache.set(user.id, user)
+            session.pop('_flashes', None)  # Clear any previous flashes
+            flash('Login berhasil!', 'success')
+            return redirect(url_for('admin_kelas'))
+        flash('Username atau password salah.', 'error')
     return render_template('admin_login.html')
 
 @app.route('/admin/logout')
 @login_required
 def admin_logout():
+    user_cache.invalidate(current_user.get_id())
     logout_user()
     session.clear()
     flash('Logout berhasil.', 'success')
@@ -241,13 +383,15 @@ def admin_kelas():
     if request.method == 'POST':
         action = request.form.get('action')
         image_id = None
+        image_variants = {}
 
-        # Handle image upload
+        # Handle image upload (original + varian thumbnail/WebP)
         if 'image_file' in request.files:
             image_file = request.files['image_file']
             if image_file.filename != '':
                 try:
-                    image_id = fs.put(image_file, filename=image_file.filename, content_type=image_file.content_type)
+                    with metrics.timed('gridfs'):
+                        image_id, image_variants = store_image(fs, image_file)
                 except Exception as e:
                     print(f"GridFS put error: {e}")
                     flash("Gagal upload gambar.", "error")
@@ -265,6 +409,7 @@ def admin_kelas():
                     "spots_available": int(request.form.get('spots_available', 0)),
                     "price": float(request.form.get('price', 0)),
                     "image_id": str(image_id) if image_id else None,
+                    "image_variants": image_variants,
                     # TAMBAHAN BARU
                     "batch_id": request.form.get('batch_id'),
                     "prerequisite_level": request.form.get('prerequisite_level') or None
@@ -295,10 +440,12 @@ def admin_kelas():
                     existing_kelas = db.kelas.find_one({"_id": ObjectId(kelas_id)})
                     if existing_kelas and existing_kelas.get('image_id'):
                         try:
-                            fs.delete(ObjectId(existing_kelas['image_id']))
+                            with metrics.timed('gridfs'):
+                                delete_image(fs, existing_kelas['image_id'])
                         except Exception as del_e:
                             print(f"Delete old image error: {del_e}")
                     update_data['image_id'] = str(image_id)
+                    update_data['image_variants'] = image_variants
                 
                 db.kelas.update_one({"_id": ObjectId(kelas_id)}, {"$set": update_data})
                 flash('Kelas berhasil diupdate!', 'success')
@@ -308,7 +455,8 @@ def admin_kelas():
                 existing_kelas = db.kelas.find_one({"_id": ObjectId(kelas_id)})
                 if existing_kelas and existing_kelas.get('image_id'):
                     try:
-                        fs.delete(ObjectId(existing_kelas['image_id']))
+                        with metrics.timed('gridfs'):
+                            delete_image(fs, existing_kelas['image_id'])
                     except Exception as del_e:
                         print(f"Delete image error: {del_e}")
                 db.kelas.delete_one({"_id": ObjectId(kelas_id)})
@@ -317,12 +465,14 @@ def admin_kelas():
         except Exception as e:
             flash(f'Error: {str(e)}', 'error')
             print(e)
+        finally:
+            catalog.invalidate()
 
         return redirect(url_for('admin_kelas'))
 
     # GET Request
     try:
-        kelas_items = list(db.kelas.find())
+        kelas_items = list(db.kelas.find().sort(queries.KELAS_SORT))
     except Exception as e:
         print(f"DB fetch error: {e}")
         kelas_items = []
@@ -331,45 +481,50 @@ def admin_kelas():
     return render_template('admin_kelas.html', kelas_items=kelas_items)
 @app.errorhandler(500)
 def internal_error(error):
+    metrics.log_error(getattr(error, 'original_exception', None) or error)
     return render_template('error.html', message="Something went wrong. Please try again."), 500
 
+@app.route('/health/ready')
+def health_ready():
+    # Readiness probe: worker sudah bisa melayani request kalau Mongo bisa di-ping
+    try:
+        mongo.ping()
+    except Exception as e:
+        # Detail error hanya di log; endpoint ini tanpa autentikasi
+        metrics.logger.warning(json.dumps({"event": "readiness_failed", "error": repr(e), "pid": os.getpid()}))
+        return jsonify(status="unavailable"), 503
+    return jsonify(
+        status="ok",
+        pid=os.getpid(),
+        import_ms=round(IMPORT_SECONDS * 1000, 1),
+        worker_boot_ms=round(WORKER_BOOT_SECONDS * 1000, 1) if WORKER_BOOT_SECONDS is not None else None,
+        cache={"catalog": catalog.stats(), "users": user_cache.stats(), "pages": page_cache.stats()},
+        login=login_guard.stats()
+    )
+
+SISWA_PAGE_SIZE = 25
+
+def laporan_summary(batch_id=None):
+    """Ringkasan per batch + info kelas dari batch_stats (tanpa daftar siswa)."""
+    laporan = batch_stats.summary(db, batch_id)
+    for item in laporan:
+        if item.get('levels'):
+            # Setiap pendaftar memakai satu kursi, jadi total = sisa + terisi
+            item['kelas_info'] = {
+                "level": ", ".join(item['levels']),
+                "spots_total": item['spots_available'] + item['total_pendaftar'],
+                "spots_terisi": item['total_pendaftar'],
+                "start_date": item['start_date']
+            }
+        else:
+            item['kelas_info'] = {"level": "Tidak ditemukan", "spots_total": 0, "spots_terisi": 0}
+    return laporan
+
 @app.route('/admin/laporan')
 @login_required
 def admin_laporan():
     try:
-        # Aggregate: Group by batch_id, count pendaftar, list siswa, dll.
-        pipeline = [
-            {"$group": {
-                "_id": "$batch_id",
-                "total_pendaftar": {"$sum": 1},
-                "pending": {"$sum": {"$cond": [{"$eq": ["$status", "pending"]}, 1, 0]}},
-                "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}},
-                "siswa_list": {"$push": {
-                    "nama": "$nama",
-                    "email": "$email",
-                    "level": "$level",
-                    "status": "$status",
-                    "tanggal": "$tanggal"
-                }}
-            }},
-            {"$sort": {"_id": 1}}  # Sort by batch_id
-        ]
-        laporan = list(db.registrations.aggregate(pipeline))
-        
-        # Ambil info kelas per batch (misalnya total spot dari kelas terkait)
-        for item in laporan:
-            batch_id = item['_id']
-            kelas = db.kelas.find_one({"batch_id": batch_id})
-            if kelas:
-                item['kelas_info'] = {
-                    "level": kelas['level'],
-                    "spots_total": 10,  # Asumsi max 10, atau ambil dari kelas['spots_available'] + terisi
-                    "spots_terisi": item['total_pendaftar'],
-                    "start_date": kelas['start_date']
-                }
-            else:
-                item['kelas_info'] = {"level": "Tidak ditemukan", "spots_total": 0, "spots_terisi": 0}
-        
+        laporan = laporan_summary()
     except Exception as e:
         print(f"Laporan error: {e}")
         flash("Gagal memuat laporan.", "error")
@@ -377,6 +532,25 @@ def admin_laporan():
     
     return render_template('admin_laporan.html', laporan=laporan)
 
+@app.route('/admin/laporan/siswa')
+@login_required
+def admin_laporan_siswa():
+    # Daftar siswa satu batch, per halaman (dimuat on demand dari admin_laporan)
+    batch_id = request.args.get('batch_id')
+    page = max(request.args.get('page', 0, type=int), 0)
+    cursor = db.registrations.find(
+        queries.batch_registrations(batch_id),
+        {"nama": 1, "email": 1, "whatsapp": 1, "level": 1, "status": 1, "tanggal": 1}
+    ).sort(queries.SISWA_SORT).skip(page * SISWA_PAGE_SIZE).limit(SISWA_PAGE_SIZE + 1)
+    siswa_list = list(cursor)
+    has_next = len(siswa_list) > SISWA_PAGE_SIZE
+    return render_template(
+        'admin_laporan_siswa.html',
+        siswa_list=siswa_list[:SISWA_PAGE_SIZE],
+        batch_id=batch_id,
+        next_page=page + 1 if has_next else None
+    )
+
 @app.route('/admin/update_status', methods=['POST'])
 @login_required
 def admin_update_status():
@@ -384,99 +558,160 @@ def admin_update_status():
         batch_id = request.form.get('batch_id')
         action = request.form.get('action')
         if action == 'complete_all':
-            db.registrations.update_many(
-                {"batch_id": batch_id},
-                {"$set": {"status": "completed"}}
-            )
+            batch_stats.set_status(db, queries.batch_registrations(batch_id), "completed")
             flash('Status semua siswa di batch ini diupdate ke Completed!', 'success')
     except Exception as e:
         print(f"Update status error: {e}")
         flash("Gagal update status.", "error")
     return redirect(url_for('admin_laporan'))
 
-# Import tambahan di atas
-import pandas as pd
-from io import StringIO  # Untuk generate CSV in-memory
+@app.route('/admin/bulk_status', methods=['POST'])
+@login_required
+def admin_bulk_status():
+    # Siswa terpilih (lintas batch) dikirim sebagai satu field "ids" dipisah koma,
+    # supaya ribuan pilihan tidak kena batas jumlah field form
+    ids, invalid = bulk.parse_ids(request.form.getlist('ids'))
+    status = request.form.get('status')
+    if not ids:
+        flash("Tidak ada siswa yang dipilih.", "error")
+        return redirect(url_for('admin_laporan'))
+    try:
+        modified, unchanged, not_found = bulk.bulk_update_status(db, ids, status)
+    except ValueError as e:
+        flash(str(e), "error")
+        return redirect(url_for('admin_laporan'))
+    except Exception as e:
+        print(f"Bulk status error: {e}")
+        flash("Gagal update status.", "error")
+        return redirect(url_for('admin_laporan'))
+    flash(f"{modified} siswa diupdate ke {status.title()}, {unchanged} sudah {status.title()}.", "success")
+    skipped = invalid + not_found
+    if skipped:
+        flash(f"{len(skipped)} ID dilewati (tidak valid/tidak ditemukan): {', '.join(skipped[:20])}"
+              + (" ..." if len(skipped) > 20 else ""), "error")
+    return redirect(url_for('admin_laporan'))
+
+@app.route('/admin/import', methods=['GET', 'POST'])
+@login_required
+def admin_import():
+    report = None
+    if request.method == 'POST':
+        kind = request.form.get('kind')
+        upload = request.files.get('csv_file')
+        if kind not in ('kelas', 'registrations') or not upload or upload.filename == '':
+            flash("Pilih jenis data dan file CSV.", "error")
+            return redirect(url_for('admin_import'))
+        try:
+            report = bulk.import_csv(db, upload.stream, kind)
+        except Exception as e:
+            print(f"Import error: {e}")
+            flash("Gagal import CSV.", "error")
+            return redirect(url_for('admin_import'))
+        finally:
+            # Kelas berubah, atau sisa kursi berkurang karena pendaftaran baru
+            catalog.invalidate()
+    return render_template(
+        'admin_import.html',
+        report=report,
+        kelas_columns=bulk.KELAS_COLUMNS,
+        registration_columns=bulk.REGISTRATION_COLUMNS,
+    )
+
+EXPORT_COLUMNS = [
+    'Batch ID', 'Total Pendaftar', 'Pending', 'Completed', 'Level Kelas', 'Spots Terisi/Total',
+    'Tanggal Mulai', 'Nama Siswa', 'Email Siswa', 'Level Siswa', 'Status Siswa', 'Tanggal Daftar'
+]
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+def export_rows(query):
+    """Row per siswa, langsung dari cursor Mongo (tidak ditampung di memori)."""
+    # Ringkasan batch diambil sekarang, supaya error muncul sebelum response dikirim
+    summary = laporan_summary(query.get('batch_id'))
+    laporan = {item['_id']: item for item in summary}
+    siswa_cursor = db.registrations.find(
+        query,
+        {"batch_id": 1, "nama": 1, "email": 1, "level": 1, "status": 1, "tanggal": 1}
+    ).sort(queries.EXPORT_SORT).batch_size(1000)
+    return _export_rows(laporan, siswa_cursor)
+
+def _export_rows(laporan, siswa_cursor):
+    for siswa in siswa_cursor:
+        item = laporan.get(siswa.get('batch_id'))
+        if item is None:
+            # Batch belum punya counter (batch_stats belum di-rebuild): siswa tetap diexport
+            item = {"_id": siswa.get('batch_id'), "total_pendaftar": 'N/A', "pending": 'N/A',
+                    "completed": 'N/A', "kelas_info": {"level": "Tidak ditemukan"}}
+        kelas_info = item['kelas_info']
+        yield [
+            item['_id'],
+            item['total_pendaftar'],
+            item['pending'],
+            item['completed'],
+            kelas_info.get('level', 'N/A'),
+            f"{kelas_info.get('spots_terisi', 0)}/{kelas_info.get('spots_total', 0)}",
+            kelas_info.get('start_date', 'N/A'),
+            siswa.get('nama'),
+            siswa.get('email'),
+            siswa.get('level'),
+            siswa.get('status'),
+            siswa['tanggal'].strftime('%Y-%m-%d')
+        ]
+
+def stream_csv(rows):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_FLUSH_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def write_xlsx(rows):
+    # Import di sini: xlsxwriter hanya dipakai untuk export XLSX
+    import xlsxwriter
+    output = tempfile.TemporaryFile()
+    # constant_memory: tiap baris langsung di-flush ke disk, memori tetap datar
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    sheet = workbook.add_worksheet('Laporan')
+    sheet.write_row(0, 0, EXPORT_COLUMNS)
+    for i, row in enumerate(rows, start=1):
+        sheet.write_row(i, 0, row)
+    workbook.close()
+    output.seek(0)
+    return output
 
 # Route baru untuk export
 @app.route('/admin/export_laporan', methods=['GET'])
 @login_required
 def admin_export_laporan():
+    export_format = request.args.get('format', 'csv')
+    filename = f'laporan_pendaftaran_{datetime.now().strftime("%Y%m%d")}'
     try:
-        # Ambil data laporan sama seperti di admin_laporan
-        pipeline = [
-            {"$group": {
-                "_id": "$batch_id",
-                "total_pendaftar": {"$sum": 1},
-                "pending": {"$sum": {"$cond": [{"$eq": ["$status", "pending"]}, 1, 0]}},
-                "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}},
-                "siswa_list": {"$push": {
-                    "nama": "$nama",
-                    "email": "$email",
-                    "level": "$level",
-                    "status": "$status",
-                    "tanggal": "$tanggal"
-                }}
-            }},
-            {"$sort": {"_id": 1}}
-        ]
-        laporan = list(db.registrations.aggregate(pipeline))
-        
-        # Tambah info kelas seperti di admin_laporan
-        for item in laporan:
-            batch_id = item['_id']
-            kelas = db.kelas.find_one({"batch_id": batch_id})
-            if kelas:
-                item['kelas_info'] = {
-                    "level": kelas['level'],
-                    "spots_total": 10,  # Asumsi, atau sesuaikan
-                    "spots_terisi": item['total_pendaftar'],
-                    "start_date": kelas['start_date']
-                }
-            else:
-                item['kelas_info'] = {"level": "Tidak ditemukan", "spots_total": 0, "spots_terisi": 0}
-        
-        # Flatten data untuk CSV (buat list of dicts)
-        flattened_data = []
-        for item in laporan:
-            kelas_info = item.get('kelas_info', {})
-            row = {
-                'Batch ID': item['_id'],
-                'Total Pendaftar': item['total_pendaftar'],
-                'Pending': item['pending'],
-                'Completed': item['completed'],
-                'Level Kelas': kelas_info.get('level', 'N/A'),
-                'Spots Terisi/Total': f"{kelas_info.get('spots_terisi', 0)}/{kelas_info.get('spots_total', 0)}",
-                'Tanggal Mulai': kelas_info.get('start_date', 'N/A')
-            }
-            # Tambah siswa list sebagai kolom terpisah jika perlu, tapi untuk sederhana, kita buat row per siswa
-            for siswa in item['siswa_list']:
-                siswa_row = row.copy()
-                siswa_row.update({
-                    'Nama Siswa': siswa['nama'],
-                    'Email Siswa': siswa['email'],
-                    'Level Siswa': siswa['level'],
-                    'Status Siswa': siswa['status'],
-                    'Tanggal Daftar': siswa['tanggal'].strftime('%Y-%m-%d')
-                })
-                flattened_data.append(siswa_row)
-        
-        # Generate CSV
-        output = StringIO()
-        df = pd.DataFrame(flattened_data)
-        df.to_csv(output, index=False)
-        output.seek(0)
-        
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'laporan_pendaftaran_{datetime.now().strftime("%Y%m%d")}.csv'
-        )
+        query = queries.export_query(request.args)
+        if export_format == 'xlsx':
+            return send_file(
+                write_xlsx(export_rows(query)),
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                as_attachment=True,
+                download_name=f'{filename}.xlsx'
+            )
+        # CSV di-stream per potongan selama cursor berjalan
+        response = Response(stream_with_context(stream_csv(export_rows(query))), mimetype='text/csv')
+        response.headers.set('Content-Disposition', 'attachment', filename=f'{filename}.csv')
+        return response
     except Exception as e:
         print(f"Export error: {e}")
         flash("Gagal export laporan.", "error")
         return redirect(url_for('admin_laporan'))
 
+# Waktu import modul ini. Dengan preload_app (gunicorn.conf.py) ini dibayar
+# sekali oleh master sebelum fork, bukan oleh tiap worker.
+IMPORT_SECONDS = time.perf_counter() - _import_started
+# Waktu fork sampai worker siap, diisi hook post_worker_init di gunicorn.conf.py
+WORKER_BOOT_SECONDS = None
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""Mode ASGI (opsional) untuk route publik dan streaming gambar.
+
+    pip install -r requirment-asgi.text
+    uvicorn asgi:app --workers 4 --host 0.0.0.0 --port 5000
+
+index, kelas, kelas_detail, serve_image dan kontak dilayani di event loop
+dengan ``AsyncMongoClient`` dan ``AsyncGridFS``, jadi satu proses bisa
+menunggu banyak query Mongo dan klien lambat (download gambar) sekaligus
+tanpa memakan satu worker per request. HTML tetap dirender oleh app Flask
+(template, flash, page cache, ETag/304 sama persis): data katalog dimuat
+secara async dulu, lalu view Flask melayani dari cache di memori.
+
+Semua route lain (admin, daftar, placement test, health, metrics, assets)
+tetap berjalan sync lewat a2wsgi di thread pool (``ASGI_WSGI_THREADS``).
+"""
+import contextlib
+import os
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+
+from a2wsgi import WSGIMiddleware
+from bson.objectid import ObjectId
+from flask import flash, make_response, redirect, render_template, request as flask_request, url_for
+from gridfs import AsyncGridFS
+from pymongo import AsyncMongoClient
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import Headers
+from werkzeug.http import http_date, parse_range_header, quote_etag, unquote_etag
+
+import catalog
+from app import IMAGE_CACHE_MAX_AGE, app as flask_app, kontak_document
+from images import IMAGE_FORMATS, IMAGE_SIZES, variant_query
+from mongo import DB_NAME, client_options
+
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 10))
+
+
+class AsyncMongo:
+    """AsyncMongoClient per proses, dibuat saat startup event loop."""
+
+    def __init__(self):
+        self.client = None
+        self.db = None
+        self.fs = None
+
+    def connect(self):
+        self.client = AsyncMongoClient(flask_app.config['MONGO_URI'], **client_options())
+        self.db = self.client[DB_NAME]
+        self.fs = AsyncGridFS(self.db)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+
+amongo = AsyncMongo()
+
+
+def flask_context(request, body=None):
+    """Request context Flask dari request ASGI (cookie session, query, form)."""
+    return flask_app.test_request_context(
+        request.url.path,
+        base_url=f"{request.url.scheme}://{request.headers.get('host', 'localhost')}",
+        method=request.method,
+        headers=[(k, v) for k, v in request.headers.items() if k.lower() != 'content-length'],
+        query_string=request.url.query,
+        data=body,
+        environ_base={'REMOTE_ADDR': request.client.host if request.client else None},
+    )
+
+
+def to_asgi(flask_response):
+    body = flask_response.get_data()
+    response = Response(body, status_code=flask_response.status_code)
+    response.raw_headers = [
+        (key.lower().encode('latin-1'), value.encode('latin-1'))
+        for key, value in flask_response.headers.items()
+    ]
+    # call_on_close (metrics) dijalankan di sini, body sudah lengkap
+    flask_response.close()
+    return response
+
+
+def _dispatch(request, body=None):
+    with flask_context(request, body):
+        try:
+            response = flask_app.full_dispatch_request()
+        except Exception as e:
+            # Sama seperti Flask.wsgi_app: errorhandler(500) + log
+            response = flask_app.handle_exception(e)
+        return to_asgi(response)
+
+
+async def dispatch(request, body=None):
+    """Jalankan route Flask biasa (before/after_request, session) untuk request ini.
+
+    View Flask memakai pymongo/GridFS sync, jadi dijalankan di thread pool
+    supaya event loop tidak ikut menunggu (mis. server selection saat DB mati).
+    """
+    return await run_in_threadpool(_dispatch, request, body)
+
+
+async def catalog_page(request):
+    # index, kelas, kelas_detail: I/O katalog async, render dari cache di Flask
+    try:
+        await catalog.warm_async(amongo.db)
+    except Exception as e:
+        # View Flask yang akan menangani error database (flash + fallback)
+        print(f"Async catalog error: {e}")
+    return await dispatch(request)
+
+
+async def kontak(request):
+    if request.method != 'POST':
+        return await dispatch(request)
+    body = await request.body()
+    with flask_context(request, body):
+        # before_request boleh langsung mengembalikan response (sama seperti Flask)
+        response = flask_app.preprocess_request()
+        if response is not None:
+            return to_asgi(flask_app.process_response(make_response(response)))
+        try:
+            await amongo.db.kontak.insert_one(kontak_document(flask_request.form))
+            flash("Pesan terkirim! Kami akan balas secepatnya.", "success")
+            response = redirect(url_for('kontak'))
+        except Exception as e:
+            print(f"Kontak error: {e}")
+            flash(f"Gagal mengirim pesan: {str(e)}", "error")
+            response = make_response(render_template('kontak.html'))
+        return to_asgi(flask_app.process_response(response))
+
+
+async def serve_image(request):
+    image_id = request.path_params['image_id']
+    size = request.query_params.get('size')
+    fmt = request.query_params.get('format', 'jpeg')
+    try:
+        grid_out = None
+        if size in IMAGE_SIZES and fmt in IMAGE_FORMATS:
+            grid_out = await amongo.fs.find_one(variant_query(image_id, size, fmt))
+        exact = grid_out is not None or size is None
+        if grid_out is None:
+            grid_out = await amongo.fs.get(ObjectId(image_id))
+    except Exception as e:
+        print(f"Image serve error: {e}")
+        return await dispatch(request)  # placeholder lewat Flask
+
+    # Header cache sama dengan serve_image di app.py
+    etag = getattr(grid_out, 'md5', None) or f"{grid_out._id}-{grid_out.length}"
+    headers = Headers()
+    headers['ETag'] = quote_etag(etag)
+    headers['Last-Modified'] = http_date(grid_out.upload_date)
+    headers['Accept-Ranges'] = 'bytes'
+    if exact:
+        headers['Cache-Control'] = f"public, max-age={IMAGE_CACHE_MAX_AGE}, immutable"
+    else:
+        headers['Cache-Control'] = "public, max-age=3600"
+    if grid_out.filename:
+        headers.set('Content-Disposition', 'inline', filename=grid_out.filename)
+
+    if _not_modified(request, etag, grid_out.upload_date):
+        return Response(status_code=304, headers=dict(headers))
+
+    start, end, status = 0, grid_out.length, 200
+    byte_range = parse_range_header(request.headers.get('range'))
+    if byte_range is not None and _if_range_ok(request, etag):
+        span = byte_range.range_for_length(grid_out.length)
+        if span is None:
+            headers['Content-Range'] = f"bytes */{grid_out.length}"
+            return Response(status_code=416, headers=dict(headers))
+        start, end = span
+        status = 206
+        headers['Content-Range'] = f"bytes {start}-{end - 1}/{grid_out.length}"
+    headers['Content-Length'] = str(end - start)
+
+    return StreamingResponse(
+        _stream(grid_out, start, end),
+        status_code=status,
+        media_type=grid_out.content_type or 'application/octet-stream',
+        headers=dict(headers),
+    )
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        return if_none_match.strip() == '*' or etag in [
+            unquote_etag(tag.strip())[0] for tag in if_none_match.split(',')
+        ]
+    if_modified_since = request.headers.get('if-modified-since')
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP date hanya sampai detik; upload_date dari pymongo naive UTC
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def _if_range_ok(request, etag):
+    if_range = request.headers.get('if-range')
+    return not if_range or unquote_etag(if_range)[0] == etag
+
+
+async def _stream(grid_out, start, end):
+    # Per chunk GridFS; event loop bebas melayani request lain selama klien lambat
+    if start:
+        await grid_out.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        data = await grid_out.read(min(grid_out.chunk_size, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+        yield data
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    amongo.connect()
+    try:
+        yield
+    finally:
+        await amongo.close()
+
+
+app = Starlette(
+    routes=[
+        Route('/', catalog_page),
+        Route('/kelas', catalog_page),
+        Route('/kelas/{kelas_id}', catalog_page),
+        Route('/image/{image_id}', serve_image),
+        Route('/kontak', kontak, methods=['GET', 'POST']),
+        Mount('/', app=WSGIMiddleware(flask_app, workers=WSGI_THREADS)),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,63 @@
+"""Asset statis hasil build_assets.py: nama ber-hash, cache selamanya.
+
+``url_for('static', filename=...)`` di template di-override supaya memakai
+file dari ``static/dist`` kalau ada di manifest, dan jatuh kembali ke
+static biasa kalau build belum dijalankan.
+"""
+import json
+import os
+
+from flask import send_from_directory, url_for
+
+DIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+ASSET_MAX_AGE = 31536000
+
+_manifest = None
+
+
+def manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH, encoding='utf-8') as f:
+                _manifest = json.load(f)
+        except FileNotFoundError:
+            _manifest = {}
+    return _manifest
+
+
+def lookup(filename):
+    # Manifest di-key lowercase supaya beda huruf besar/kecil tidak jadi 404 di Linux
+    return manifest().get(filename.lower())
+
+
+def asset_url_for(endpoint, **values):
+    if endpoint == 'static':
+        entry = lookup(values.get('filename', ''))
+        if entry:
+            return url_for('asset', filename=entry['file'])
+    return url_for(endpoint, **values)
+
+
+def asset_srcset(filename, format='jpeg'):
+    """srcset varian responsif dari manifest ('' kalau tidak ada)."""
+    entry = lookup(filename) or {}
+    return ', '.join(
+        f"{url_for('asset', filename=path)} {width}w"
+        for path, width in entry.get('srcset', {}).get(format, [])
+    )
+
+
+def serve_asset(filename):
+    response = send_from_directory(DIST_DIR, filename, max_age=ASSET_MAX_AGE)
+    # Nama file mengandung hash isi, jadi aman dianggap tidak pernah berubah
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    app.add_url_rule('/assets/<path:filename>', 'asset', serve_asset)
+    app.jinja_env.globals['url_for'] = asset_url_for
+    app.jinja_env.globals['asset_srcset'] = asset_srcset
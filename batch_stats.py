@@ -0,0 +1,227 @@
+"""Statistik pendaftaran per batch yang dijaga saat penulisan.
+
+``db.batch_stats`` berisi satu dokumen per batch (``_id`` = batch_id)::
+
+    {"_id": "2025-01", "total_pendaftar": 12, "pending": 5, "completed": 7, "updated_at": ...}
+
+Setiap penulisan ke ``registrations`` (daftar, update status, bulk status,
+import CSV) ikut menaikkan/menurunkan counter di sini dengan ``$inc``,
+jadi dashboard admin cukup membaca satu dokumen per batch, bukan
+meng-aggregate seluruh pendaftaran.
+
+Saat proses pertama kali terkoneksi, ``ensure_stats`` membangun counter dari
+aggregation penuh kalau ``STATS_VERSION`` belum pernah diterapkan (database
+lama yang sudah punya pendaftaran) atau koleksinya kosong.
+
+Counter bisa melenceng kalau proses mati di antara dua penulisan atau data
+diubah langsung di database. Cocokkan lagi dengan aggregation penuh::
+
+    python batch_stats.py --check     # bandingkan saja, exit 1 kalau ada selisih
+    python batch_stats.py --rebuild   # tulis ulang counter yang selisih
+"""
+import sys
+from collections import Counter
+from datetime import datetime
+
+# Naikkan kalau cara menghitung counter berubah; ensure_stats akan rebuild sekali
+# (v2: setiap dokumen punya semua counter, termasuk yang masih 0)
+STATS_VERSION = 2
+STATUSES = ('pending', 'completed')
+COUNTERS = ('total_pendaftar',) + STATUSES
+
+
+def _apply(db, deltas):
+    """{batch_id: Counter(field -> delta)} -> satu $inc upsert per batch.
+
+    Semua counter ikut di-$inc (delta 0 juga), supaya batch baru langsung
+    punya ``pending``/``completed`` = 0 dan bukan field yang hilang.
+    """
+    # Biasanya hanya satu atau beberapa batch per penulisan, cukup update_one
+    now = datetime.utcnow()
+    for batch_id, inc in deltas.items():
+        if any(inc.values()):
+            db.batch_stats.update_one(
+                {"_id": batch_id},
+                {"$inc": {name: inc[name] for name in COUNTERS}, "$set": {"updated_at": now}},
+                upsert=True)
+
+
+def record_registrations(db, registrations):
+    """Pendaftaran baru: iterable (batch_id, status)."""
+    deltas = {}
+    for batch_id, status in registrations:
+        inc = deltas.setdefault(batch_id, Counter())
+        inc['total_pendaftar'] += 1
+        if status in STATUSES:
+            inc[status] += 1
+    _apply(db, deltas)
+
+
+def record_registration(db, batch_id, status):
+    record_registrations(db, [(batch_id, status)])
+
+
+def record_status_changes(db, changes):
+    """Perubahan status: iterable (batch_id, status lama, status baru, jumlah)."""
+    deltas = {}
+    for batch_id, old, new, count in changes:
+        if not count or old == new:
+            continue
+        inc = deltas.setdefault(batch_id, Counter())
+        if old in STATUSES:
+            inc[old] -= count
+        if new in STATUSES:
+            inc[new] += count
+    _apply(db, deltas)
+
+
+def set_status(db, query, status):
+    """Set status pendaftaran yang cocok dengan ``query`` dan sesuaikan counter.
+
+    Update dipecah per (batch_id, status lama), jadi ``modified_count`` tiap
+    update persis jumlah yang pindah status; tidak ada hitungan ganda walau
+    ada request lain yang mengubah status yang sama bersamaan.
+    Return (jumlah diupdate, jumlah cocok).
+    """
+    groups = db.registrations.aggregate([
+        {"$match": query},
+        {"$group": {"_id": {"batch_id": "$batch_id", "status": "$status"}, "count": {"$sum": 1}}},
+    ])
+    matched = modified = 0
+    changes = []
+    for group in groups:
+        batch_id, old = group['_id'].get('batch_id'), group['_id'].get('status')
+        matched += group['count']
+        if old == status:
+            continue
+        result = db.registrations.update_many(
+            {"$and": [query, {"batch_id": batch_id, "status": old}]},
+            {"$set": {"status": status}},
+        )
+        modified += result.modified_count
+        changes.append((batch_id, old, status, result.modified_count))
+    record_status_changes(db, changes)
+    return modified, matched
+
+
+def summary_pipeline(batch_id=None):
+    pipeline = [{"$match": {"_id": batch_id}}] if batch_id else []
+    return pipeline + [
+        {"$match": {"total_pendaftar": {"$gt": 0}}},
+        {"$sort": {"_id": 1}},
+        {"$lookup": {
+            "from": "kelas",
+            "localField": "_id",
+            "foreignField": "batch_id",
+            "as": "kelas"
+        }},
+        {"$project": {
+            "total_pendaftar": {"$ifNull": ["$total_pendaftar", 0]},
+            "pending": {"$ifNull": ["$pending", 0]},
+            "completed": {"$ifNull": ["$completed", 0]},
+            "levels": "$kelas.level",
+            "start_date": {"$min": "$kelas.start_date"},
+            "spots_available": {"$sum": "$kelas.spots_available"}
+        }}
+    ]
+
+
+def summary(db, batch_id=None):
+    """Counter + info kelas per batch, urut batch_id. Biaya O(jumlah batch)."""
+    return list(db.batch_stats.aggregate(summary_pipeline(batch_id)))
+
+
+def counts_pipeline():
+    return [
+        # Urut batch_id dulu supaya $group bisa memakai index (batch_id, status) tanpa fetch dokumen
+        {"$sort": {"batch_id": 1}},
+        {"$group": {
+            "_id": "$batch_id",
+            "total_pendaftar": {"$sum": 1},
+            "pending": {"$sum": {"$cond": [{"$eq": ["$status", "pending"]}, 1, 0]}},
+            "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}}
+        }},
+    ]
+
+
+def aggregate_counts(db):
+    """Hitungan sebenarnya dari seluruh registrations (mahal, untuk check/rebuild)."""
+    return {
+        item['_id']: {name: item[name] for name in COUNTERS}
+        for item in db.registrations.aggregate(counts_pipeline(), allowDiskUse=True)
+    }
+
+
+def diff(db):
+    """List (batch_id, counter tersimpan, counter sebenarnya) yang tidak sama.
+
+    Counter yang tidak ada di dokumen terbaca None, jadi ikut dianggap selisih.
+    """
+    actual = aggregate_counts(db)
+    stored = {
+        doc['_id']: {name: doc.get(name) for name in COUNTERS}
+        for doc in db.batch_stats.find({}, {name: 1 for name in COUNTERS})
+    }
+    empty = dict.fromkeys(COUNTERS, 0)
+    drift = []
+    for batch_id in sorted(set(actual) | set(stored), key=lambda b: (b is None, str(b))):
+        expected = actual.get(batch_id, empty)
+        current = stored.get(batch_id, empty)
+        if expected != current:
+            drift.append((batch_id, current, expected))
+    return drift
+
+
+def rebuild(db):
+    """Tulis ulang counter yang melenceng dari aggregation penuh. Return jumlah batch yang diperbaiki.
+
+    Jalankan saat trafik sepi: pendaftaran yang masuk di antara aggregation
+    dan penulisan ulang bisa tertimpa (cek lagi dengan ``--check``).
+    """
+    drift = diff(db)
+    now = datetime.utcnow()
+    for batch_id, _, expected in drift:
+        db.batch_stats.update_one({"_id": batch_id}, {"$set": dict(expected, updated_at=now)}, upsert=True)
+    return len(drift)
+
+
+def ensure_stats(db):
+    """Dipanggil sekali per proses saat terkoneksi (lihat mongo.on_connect).
+
+    Rebuild kalau versi counter belum diterapkan, atau batch_stats kosong
+    padahal sudah ada pendaftaran. Return True kalau rebuild dijalankan.
+    """
+    meta = db.schema_meta.find_one({"_id": "batch_stats"}) or {}
+    empty = db.batch_stats.find_one({}, {"_id": 1}) is None
+    if meta.get("version", 0) >= STATS_VERSION and not (
+            empty and db.registrations.find_one({}, {"_id": 1}) is not None):
+        return False
+    fixed = rebuild(db)
+    db.schema_meta.update_one(
+        {"_id": "batch_stats"},
+        {"$set": {"version": STATS_VERSION, "applied_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    print(f"batch_stats v{STATS_VERSION}: {fixed} batch dibangun ulang")
+    return True
+
+
+def main(argv):
+    from dotenv import load_dotenv
+    from mongo import mongo
+
+    load_dotenv()
+    db = mongo.db
+    if '--rebuild' in argv:
+        fixed = rebuild(db)
+        print(f"{fixed} batch diperbaiki")
+        return 0
+    drift = diff(db)
+    for batch_id, current, expected in drift:
+        print(f"{batch_id}: tersimpan {current}, seharusnya {expected}")
+    print(f"{len(drift)} batch tidak konsisten" if drift else "batch_stats konsisten")
+    return 1 if drift else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
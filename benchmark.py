@@ -0,0 +1,539 @@
+"""Benchmark & load test semua route penting.
+
+Mengisi database benchmark dengan data realistis (kelas, registrations,
+gambar GridFS, satu admin), menjalankan app lewat gunicorn, lalu memukul
+setiap route dengan concurrency yang bisa diatur. Hasil per route:
+p50/p95/p99 latency, throughput, error, dan peak RSS proses server.
+Hasil disimpan sebagai JSON supaya run bisa dibandingkan.
+
+    # pakai mongod yang sudah jalan (database terpisah!)
+    python benchmark.py --mongo-uri mongodb://localhost:27017/?directConnection=true --db-name genkan_bench
+
+    # jalankan mongod sementara di direktori temp
+    python benchmark.py --spawn-mongod
+
+    # tanpa mongod: mongomock in-process (server werkzeug, angka tidak setara gunicorn)
+    python benchmark.py --inmemory
+
+    # bandingkan dengan run sebelumnya, exit 1 kalau p95 naik > 20%
+    python benchmark.py --spawn-mongod --compare bench/baseline.json
+
+    # mode ASGI (asgi.py) vs gunicorn sync, 1 proses, beberapa level concurrency
+    python benchmark.py --spawn-mongod --server asgi --workers 1 --concurrency 1,8,32,128
+    python benchmark.py --spawn-mongod --server gunicorn --workers 1 --concurrency 1,8,32,128
+
+Route /daftar POST juga dicek overselling: total kursi yang berkurang
+harus sama dengan jumlah pendaftaran baru dan tidak ada kursi negatif.
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+import bcrypt
+
+ADMIN_USERNAME = 'bench-admin'
+ADMIN_PASSWORD = 'bench-password'
+LEVELS = ['A1-A', 'A1-C', 'A2-1B', 'A2-2B']
+
+
+# ---------------------------------------------------------------- seed data
+
+def seed(db, fs, n_kelas, n_registrations, n_images, spots=50):
+    """Isi ulang koleksi benchmark. Return info yang dibutuhkan skenario."""
+    for name in ('kelas', 'registrations', 'batch_stats', 'admins', 'kontak', 'fs.files', 'fs.chunks', 'schema_meta'):
+        db[name].drop()
+
+    image_ids = [_seed_image(fs, i) for i in range(n_images)]
+    start = datetime(2026, 1, 5)
+    kelas = []
+    for i in range(n_kelas):
+        level = LEVELS[i % len(LEVELS)]
+        kelas.append({
+            "level": level,
+            "title": f"Kelas {level} batch {i}",
+            "description": "Belajar bahasa Jepang praktis dengan kurikulum Irodori. " * 8,
+            "status": "upcoming" if i % 3 else "ongoing",
+            "start_date": (start + timedelta(days=7 * i)).strftime('%Y-%m-%d'),
+            "schedule": "Senin & Rabu, 19:00",
+            "spots_available": spots,
+            "price": 500000.0,
+            "image_id": str(image_ids[i % len(image_ids)]) if image_ids else None,
+            "image_variants": {"card": 480, "detail": 960} if image_ids else {},
+            "batch_id": f"2026-{i:03d}",
+            "prerequisite_level": None,
+        })
+    db.kelas.insert_many(kelas)
+
+    statuses = ('pending', 'completed')
+    batch = []
+    for i in range(n_registrations):
+        k = kelas[i % n_kelas]
+        batch.append({
+            "nama": f"Siswa {i}",
+            "email": f"siswa{i}@example.com",
+            "whatsapp": f"0812{i:08d}",
+            "level": k["level"],
+            "status": statuses[i % 2],
+            "tanggal": start - timedelta(minutes=i),
+            "batch_id": k["batch_id"],
+        })
+        if len(batch) == 5000:
+            db.registrations.insert_many(batch)
+            batch = []
+    if batch:
+        db.registrations.insert_many(batch)
+    # Data di-seed langsung ke registrations, jadi counter dashboard dibangun sekali di sini
+    from batch_stats import rebuild
+    rebuild(db)
+
+    db.admins.insert_one({
+        "username": ADMIN_USERNAME,
+        "password": bcrypt.hashpw(ADMIN_PASSWORD.encode('utf-8'), bcrypt.gensalt(4)),
+    })
+    kelas_ids = [str(k["_id"]) for k in db.kelas.find({}, {"_id": 1})]
+    return {"kelas_ids": kelas_ids, "image_ids": [str(i) for i in image_ids]}
+
+
+def _seed_image(fs, i):
+    try:
+        from images import store_image
+        from PIL import Image
+        from werkzeug.datastructures import FileStorage
+    except ImportError:
+        return fs.put(os.urandom(200_000), filename=f"bench{i}.jpg", content_type='image/jpeg')
+    buf = io.BytesIO()
+    Image.effect_noise((1600, 1067), 60 + i).convert('RGB').save(buf, 'JPEG', quality=90)
+    buf.seek(0)
+    image_id, _variants = store_image(fs, FileStorage(buf, filename=f"bench{i}.jpg", content_type='image/jpeg'))
+    return image_id
+
+
+def seat_snapshot(db):
+    return {
+        "spots": sum(k["spots_available"] for k in db.kelas.find({}, {"spots_available": 1})),
+        "negative": db.kelas.count_documents({"spots_available": {"$lt": 0}}),
+        "registrations": db.registrations.count_documents({}),
+    }
+
+
+# ---------------------------------------------------------------- servers
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/health/ready')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server di port {port} tidak siap dalam {timeout} detik")
+
+
+def spawn_mongod():
+    mongod = shutil.which('mongod')
+    if not mongod:
+        sys.exit("mongod tidak ditemukan di PATH (pakai --mongo-uri atau --inmemory)")
+    dbpath = tempfile.mkdtemp(prefix='genkan-bench-')
+    port = free_port()
+    proc = subprocess.Popen(
+        [mongod, '--dbpath', dbpath, '--port', str(port), '--bind_ip', '127.0.0.1', '--quiet'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    uri = f"mongodb://127.0.0.1:{port}/?directConnection=true"
+    from pymongo import MongoClient
+    client = MongoClient(uri, serverSelectionTimeoutMS=30000)
+    client.admin.command('ping')
+    client.close()
+
+    def stop():
+        proc.terminate()
+        proc.wait(timeout=30)
+        shutil.rmtree(dbpath, ignore_errors=True)
+    return uri, stop
+
+
+class ServerProcess:
+    """App di subprocess: gunicorn (WSGI, app.py) atau uvicorn (ASGI, asgi.py)."""
+
+    def __init__(self, kind, mongo_uri, db_name, workers, threads, extra_env=None):
+        self.port = free_port()
+        env = dict(os.environ, MONGO_URI=mongo_uri, MONGO_DB_NAME=db_name, **(extra_env or {}))
+        if kind == 'asgi':
+            command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+                       '--port', str(self.port), '--workers', str(workers), '--no-access-log']
+        else:
+            command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                       '--bind', f'127.0.0.1:{self.port}', '--workers', str(workers),
+                       '--threads', str(threads), 'app:app']
+        self.proc = subprocess.Popen(
+            command, cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        wait_ready(self.port)
+
+    def pids(self):
+        return [self.proc.pid] + _children(self.proc.pid)
+
+    def stop(self):
+        self.proc.terminate()
+        self.proc.wait(timeout=30)
+
+
+class InProcessServer:
+    """Server werkzeug threaded di proses ini, untuk mode --inmemory."""
+
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.port = free_port()
+        self.server = make_server('127.0.0.1', self.port, app, threaded=True, request_handler=QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        wait_ready(self.port)
+
+    def pids(self):
+        return [os.getpid()]
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def _children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def rss_bytes(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return total
+
+
+class RssSampler:
+    """Sampling RSS total proses server selama satu skenario (peak)."""
+
+    def __init__(self, server, interval=0.05):
+        self.server = server
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_bytes(self.server.pids()))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes(self.server.pids()))
+
+
+# ---------------------------------------------------------------- load driver
+
+class Client:
+    """Koneksi HTTP keep-alive per thread."""
+
+    def __init__(self, port, cookie=None):
+        self.port = port
+        self.cookie = cookie
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def request(self, method, path, body=None):
+        headers = {'Accept-Encoding': 'gzip'}
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        if body is not None:
+            body = urlencode(body)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            # Baca sampai habis (termasuk response streaming)
+            while response.read(65536):
+                pass
+            return response
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            raise
+
+
+def login_cookie(port):
+    client = Client(port)
+    response = client.request('POST', '/admin/login', {'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+    cookie = response.getheader('Set-Cookie')
+    if response.status != 302 or not cookie:
+        raise RuntimeError(f"Login admin gagal (status {response.status})")
+    return cookie.split(';', 1)[0]
+
+
+def run_scenario(port, make_request, concurrency, requests_total, cookie=None):
+    """Jalankan requests_total request dengan `concurrency` thread."""
+    latencies = []
+    errors = [0]
+    counter = iter(range(requests_total))
+    lock = threading.Lock()
+
+    def worker():
+        client = Client(port, cookie)
+        local = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            method, path, body = make_request(i)
+            started = time.perf_counter()
+            try:
+                response = client.request(method, path, body)
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                ok = False
+            local.append(time.perf_counter() - started)
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return latencies, errors[0], elapsed
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed, peak_rss):
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": ms(statistics.fmean(values)) if values else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "peak_rss_mb": round(peak_rss / 2 ** 20, 1),
+    }
+
+
+def scenarios(info, requests_per_route):
+    kelas_ids = info["kelas_ids"]
+    image_ids = info["image_ids"] or [None]
+    return [
+        # (nama, butuh login, jumlah request, fungsi i -> (method, path, body))
+        ("GET /", False, requests_per_route, lambda i: ('GET', '/', None)),
+        ("GET /kelas", False, requests_per_route, lambda i: ('GET', '/kelas', None)),
+        ("GET /kelas/<id>", False, requests_per_route,
+         lambda i: ('GET', f'/kelas/{kelas_ids[i % len(kelas_ids)]}', None)),
+        ("GET /image/<id>", False, requests_per_route,
+         lambda i: ('GET', f'/image/{image_ids[i % len(image_ids)]}?size=card&format=webp', None)),
+        ("POST /daftar", False, requests_per_route,
+         lambda i: ('POST', '/daftar', {'nama': f'Bench {i}', 'email': f'bench{i}@example.com',
+                                        'whatsapp': '081200000000', 'level': random.choice(LEVELS)})),
+        ("GET /admin/laporan", True, max(requests_per_route // 10, 10), lambda i: ('GET', '/admin/laporan', None)),
+        ("GET /admin/export_laporan", True, max(requests_per_route // 50, 3),
+         lambda i: ('GET', '/admin/export_laporan', None)),
+    ]
+
+
+def compare(current, baseline_path, threshold):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = []
+    print(f"\nPerbandingan dengan {baseline_path}")
+    for name, result in current["routes"].items():
+        old = baseline.get("routes", {}).get(name)
+        if not old or not old.get("p95_ms"):
+            continue
+        change = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"]
+        flag = "REGRESI" if change > threshold else ""
+        print(f"  {name:34} p95 {old['p95_ms']:>9.2f} -> {result['p95_ms']:>9.2f} ms ({change:+.0%}) {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--mongo-uri', help="MongoDB yang dipakai (database --db-name akan DIHAPUS)")
+    source.add_argument('--spawn-mongod', action='store_true', help="jalankan mongod sementara")
+    source.add_argument('--inmemory', action='store_true', help="mongomock + server werkzeug in-process")
+    parser.add_argument('--db-name', default='genkan_bench')
+    parser.add_argument('--kelas', type=int, default=200)
+    parser.add_argument('--registrations', type=int, default=50000)
+    parser.add_argument('--images', type=int, default=5)
+    parser.add_argument('--spots', type=int, default=50,
+                        help="kursi per kelas; kecilkan supaya /daftar kehabisan kursi (uji overselling)")
+    parser.add_argument('--server', choices=('gunicorn', 'asgi'), default='gunicorn',
+                        help="gunicorn + app.py (sync) atau uvicorn + asgi.py")
+    parser.add_argument('--concurrency', default='16',
+                        help="jumlah klien paralel; daftar dipisah koma untuk melihat skala (mis. 1,8,32,128)")
+    parser.add_argument('--requests', type=int, default=1000, help="request per route publik")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--output', default=f"bench/bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    parser.add_argument('--compare', help="file JSON hasil run sebelumnya")
+    parser.add_argument('--threshold', type=float, default=0.2, help="batas kenaikan p95 (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    levels = [int(c) for c in args.concurrency.split(',')]
+    if args.inmemory and args.server == 'asgi':
+        parser.error("--server asgi butuh MongoDB sungguhan (mongomock tidak punya client async)")
+
+    cleanup = []
+    try:
+        if args.inmemory:
+            import mongomock
+            import mongomock.gridfs
+            import pymongo
+            mongomock.gridfs.enable_gridfs_integration()
+            mock_client = mongomock.MongoClient()
+            pymongo.MongoClient = lambda *a, **k: mock_client
+            os.environ['MONGO_DB_NAME'] = args.db_name
+            import app as app_module
+            from mongo import mongo
+            db, fs = mongo.db, mongo.fs
+        else:
+            if args.spawn_mongod:
+                mongo_uri, stop_mongod = spawn_mongod()
+                cleanup.append(stop_mongod)
+            else:
+                mongo_uri = args.mongo_uri
+            from gridfs import GridFS
+            from pymongo import MongoClient
+            client = MongoClient(mongo_uri)
+            cleanup.append(client.close)
+            db = client[args.db_name]
+            fs = GridFS(db)
+
+        print(f"Seeding {args.kelas} kelas, {args.registrations} registrations, {args.images} gambar...")
+        info = seed(db, fs, args.kelas, args.registrations, args.images, args.spots)
+        from indexes import ensure_indexes
+        ensure_indexes(db, force=True)
+
+        if args.inmemory:
+            server = InProcessServer(app_module.app)
+        else:
+            server = ServerProcess(args.server, mongo_uri, args.db_name, args.workers, args.threads)
+        cleanup.insert(0, server.stop)
+
+        cookie = login_cookie(server.port)
+        results = {}
+        for concurrency in levels:
+            for name, needs_login, total, make_request in scenarios(info, args.requests):
+                seats_before = seat_snapshot(db)
+                with RssSampler(server) as sampler:
+                    latencies, errors, elapsed = run_scenario(
+                        server.port, make_request, concurrency, total, cookie if needs_login else None)
+                # Satu level: key = nama route (kompatibel dengan --compare run lama)
+                key = name if len(levels) == 1 else f"{name} @c{concurrency}"
+                results[key] = r = summarize(latencies, errors, elapsed, sampler.peak)
+                r["concurrency"] = concurrency
+                print(f"{key:34} {r['throughput_rps']:>8.1f} req/s  p50 {r['p50_ms']:>8.2f}  "
+                      f"p95 {r['p95_ms']:>8.2f}  p99 {r['p99_ms']:>8.2f} ms  err {r['errors']}  "
+                      f"rss {r['peak_rss_mb']} MB")
+                if name == "POST /daftar":
+                    seats_after = seat_snapshot(db)
+                    taken = seats_before["spots"] - seats_after["spots"]
+                    registered = seats_after["registrations"] - seats_before["registrations"]
+                    r["oversell_check"] = {
+                        "seats_taken": taken,
+                        "new_registrations": registered,
+                        "negative_spots": seats_after["negative"],
+                        "ok": taken == registered and seats_after["negative"] == 0,
+                    }
+                    print(f"  overselling check: {r['oversell_check']}")
+
+        output = {
+            "meta": {
+                "started_at": datetime.utcnow().isoformat() + 'Z',
+                "git_rev": _git_rev(),
+                "args": {k: v for k, v in vars(args).items() if k not in ('mongo_uri', 'compare')},
+                "server": "werkzeug-inprocess" if args.inmemory else args.server,
+            },
+            "routes": results,
+        }
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
+        print(f"\nHasil disimpan di {args.output}")
+
+        failed = not all(r["oversell_check"]["ok"] for r in results.values() if "oversell_check" in r)
+        if args.compare:
+            failed = bool(compare(output, args.compare, args.threshold)) or failed
+        return 1 if failed else 0
+    finally:
+        for func in cleanup:
+            try:
+                func()
+            except Exception as e:
+                print(f"Cleanup error: {e}")
+
+
+def _git_rev():
+    try:
+        # Revisi repo ini, bukan direktori tempat benchmark dijalankan
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    sys.exit(main())
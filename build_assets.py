@@ -0,0 +1,106 @@
+"""Build asset statis ke static/dist (jalankan sebelum deploy).
+
+- Gambar di static/image dikompres ulang (maks. 1920px) dan dibuat varian
+  responsif 480/960/1600px dalam JPEG (PNG kalau transparan) dan WebP.
+- CSS tidak ikut di-build: layout masih memakai Tailwind Play CDN dan
+  static/src/output.css belum dibuild dari template yang dipakai.
+- Semua nama file diberi hash isi dan di-slug (tanpa spasi/kurung), lalu
+  dicatat di static/dist/manifest.json yang dibaca assets.py.
+
+    python build_assets.py
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+
+from PIL import Image, ImageOps
+
+from assets import DIST_DIR, MANIFEST_PATH
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+IMAGE_DIR = 'image'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+MAX_WIDTH = 1920
+RESPONSIVE_WIDTHS = (480, 960, 1600)
+SAVE_OPTIONS = {
+    'jpeg': {'format': 'JPEG', 'ext': 'jpg', 'quality': 80, 'optimize': True, 'progressive': True},
+    'png': {'format': 'PNG', 'ext': 'png', 'optimize': True},
+    'webp': {'format': 'WEBP', 'ext': 'webp', 'quality': 78, 'method': 6},
+}
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def write_hashed(relative_dir, stem, ext, data):
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    relative = f"{relative_dir}/{slugify(stem)}.{digest}.{ext}"
+    path = os.path.join(DIST_DIR, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return relative
+
+
+def encode(image, fmt):
+    opts = dict(SAVE_OPTIONS[fmt])
+    save_format = opts.pop('format')
+    opts.pop('ext')
+    buf = io.BytesIO()
+    image.save(buf, format=save_format, **opts)
+    return buf.getvalue()
+
+
+def build_image(filename):
+    source = os.path.join(STATIC_DIR, IMAGE_DIR, filename)
+    stem = os.path.splitext(filename)[0]
+    image = ImageOps.exif_transpose(Image.open(source))
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    fallback = 'png' if has_alpha else 'jpeg'
+
+    full = image.copy()
+    full.thumbnail((MAX_WIDTH, MAX_WIDTH * 4), Image.LANCZOS)
+    data = encode(full, fallback)
+    with open(source, 'rb') as f:
+        original = f.read()
+    if full.size == image.size and len(original) < len(data) and Image.open(source).format.lower() == fallback:
+        # File asli sudah lebih kecil dari hasil kompres ulang
+        data = original
+    entry = {
+        'file': write_hashed(IMAGE_DIR, stem, SAVE_OPTIONS[fallback]['ext'], data),
+        # 'jpeg' = format fallback (PNG untuk gambar transparan), dipakai asset_srcset()
+        'srcset': {'jpeg': [], 'webp': []},
+    }
+    for width in [w for w in RESPONSIVE_WIDTHS if w < full.width]:
+        resized = full.copy()
+        resized.thumbnail((width, width * 4), Image.LANCZOS)
+        entry['srcset']['jpeg'].append(
+            [write_hashed(IMAGE_DIR, f"{stem}-{width}", SAVE_OPTIONS[fallback]['ext'], encode(resized, fallback)), resized.width])
+        entry['srcset']['webp'].append(
+            [write_hashed(IMAGE_DIR, f"{stem}-{width}", 'webp', encode(resized, 'webp')), resized.width])
+    entry['srcset']['jpeg'].append([entry['file'], full.width])
+    entry['srcset']['webp'].append([write_hashed(IMAGE_DIR, stem, 'webp', encode(full, 'webp')), full.width])
+    return entry
+
+
+def main():
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    os.makedirs(DIST_DIR)
+    manifest = {}
+
+    for filename in sorted(os.listdir(os.path.join(STATIC_DIR, IMAGE_DIR))):
+        if filename.lower().endswith(IMAGE_EXTENSIONS):
+            manifest[f"{IMAGE_DIR}/{filename}".lower()] = build_image(filename)
+            print(f"image/{filename} -> {manifest[f'{IMAGE_DIR}/{filename}'.lower()]['file']}")
+
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""Operasi massal admin: import CSV kelas/pendaftaran dan ubah status siswa.
+
+CSV dibaca baris per baris dari file upload (werkzeug menyimpannya ke file
+sementara, bukan ke memori), divalidasi per baris, lalu ditulis per
+``BULK_BATCH_SIZE`` baris dengan satu ``bulk_write(ordered=False)``. Baris
+yang gagal validasi atau gagal ditulis dicatat di laporan dengan nomor
+barisnya; baris lain tetap masuk.
+
+Import bersifat idempotent: kelas di-upsert berdasarkan ``batch_id``,
+pendaftaran berdasarkan (``batch_id``, ``email``) dan hanya dibuat kalau
+belum ada. ``spots_available`` dari CSV kelas hanya dipakai untuk kelas
+baru; kursi kelas yang sudah ada (dan sudah terisi) tidak ditimpa.
+
+Setiap pendaftaran baru mengambil satu kursi dengan ``$inc`` bersyarat,
+sama seperti ``reserve_seat`` di /daftar, jadi import tidak bisa membuat
+kelas overselling: baris yang tidak kebagian kursi dicatat sebagai error.
+Pendaftaran baru dan perubahan status ikut dicatat di ``batch_stats``.
+"""
+import csv
+import io
+import os
+import re
+from collections import Counter
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import batch_stats
+import queries
+
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 1000))
+MAX_REPORTED_ERRORS = 500
+KELAS_STATUSES = ('upcoming', 'ongoing')
+REGISTRATION_STATUSES = ('pending', 'completed')
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+KELAS_COLUMNS = ['batch_id', 'level', 'title', 'description', 'status', 'start_date',
+                 'schedule', 'spots_available', 'price', 'prerequisite_level']
+REGISTRATION_COLUMNS = ['batch_id', 'nama', 'email', 'whatsapp', 'level', 'status', 'tanggal']
+
+
+class ImportReport:
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.errors = []  # (nomor baris, pesan), dibatasi MAX_REPORTED_ERRORS
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self):
+        return (f"{self.rows} baris diproses: {self.inserted} baru, {self.updated} diupdate, "
+                f"{self.unchanged} sudah ada, {self.error_count} gagal")
+
+
+def _required(row, *names):
+    for name in names:
+        if not (row.get(name) or '').strip():
+            raise ValueError(f"kolom '{name}' kosong")
+    return {name: row[name].strip() for name in names}
+
+
+def _date(value, name):
+    try:
+        return datetime.strptime(value.strip(), '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"{name} harus YYYY-MM-DD, bukan '{value}'")
+
+
+def parse_kelas(row):
+    """Baris CSV -> (filter, update) untuk upsert kelas. ValueError kalau tidak valid."""
+    doc = _required(row, 'batch_id', 'level', 'title', 'status', 'start_date', 'schedule')
+    if doc['status'] not in KELAS_STATUSES:
+        raise ValueError(f"status harus salah satu dari {', '.join(KELAS_STATUSES)}")
+    # start_date disimpan sebagai string YYYY-MM-DD, sama seperti form admin_kelas
+    _date(doc['start_date'], 'start_date')
+    try:
+        doc['spots_available'] = int(row.get('spots_available') or 0)
+        doc['price'] = float(row.get('price') or 0)
+    except ValueError:
+        raise ValueError("spots_available/price harus angka")
+    if doc['spots_available'] < 0:
+        raise ValueError("spots_available tidak boleh negatif")
+    doc['description'] = (row.get('description') or '').strip()
+    doc['prerequisite_level'] = (row.get('prerequisite_level') or '').strip() or None
+    # Sisa kursi kelas lama sudah dikurangi pendaftar, jangan ditimpa
+    spots = doc.pop('spots_available')
+    return (
+        {"batch_id": doc['batch_id']},
+        {"$set": doc, "$setOnInsert": {"spots_available": spots, "image_id": None, "image_variants": {}}},
+    )
+
+
+def parse_registration(row, batches):
+    """Baris CSV -> (filter, update) untuk pendaftaran. ``batches``: {batch_id: level}."""
+    doc = _required(row, 'batch_id', 'nama', 'email')
+    if doc['batch_id'] not in batches:
+        raise ValueError(f"batch_id '{doc['batch_id']}' tidak ada di data kelas")
+    doc['email'] = doc['email'].lower()
+    if not EMAIL_RE.match(doc['email']):
+        raise ValueError(f"email tidak valid: '{doc['email']}'")
+    doc['status'] = (row.get('status') or 'pending').strip().lower()
+    if doc['status'] not in REGISTRATION_STATUSES:
+        raise ValueError(f"status harus salah satu dari {', '.join(REGISTRATION_STATUSES)}")
+    doc['whatsapp'] = (row.get('whatsapp') or '').strip()
+    doc['level'] = (row.get('level') or '').strip() or batches[doc['batch_id']]
+    doc['tanggal'] = _date(row['tanggal'], 'tanggal') if (row.get('tanggal') or '').strip() else datetime.utcnow()
+    return (
+        {"batch_id": doc['batch_id'], "email": doc['email']},
+        {"$setOnInsert": doc},
+    )
+
+
+def _flush(collection, ops, lines, report):
+    """Tulis ops; return index op yang membuat dokumen baru (upsert)."""
+    if not ops:
+        return []
+    try:
+        result = collection.bulk_write(ops, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for err in details.get('writeErrors', []):
+            report.error(lines[err['index']], err.get('errmsg', 'gagal ditulis'))
+    upserted = details.get('nUpserted', 0)
+    modified = details.get('nModified', 0)
+    report.inserted += upserted
+    report.updated += modified
+    report.unchanged += details.get('nMatched', 0) - modified
+    ops.clear()
+    lines.clear()
+    return [u['index'] for u in details.get('upserted', [])]
+
+
+def take_seats(db, batch_id, count):
+    """Ambil sampai ``count`` kursi di kelas ``batch_id``. Return jumlah yang didapat."""
+    while count > 0:
+        # Bersyarat seperti reserve_seat: sisa kursi tidak pernah negatif
+        if db.kelas.find_one_and_update(
+                {"batch_id": batch_id, "spots_available": {"$gte": count}},
+                {"$inc": {"spots_available": -count}},
+                projection={"_id": 1}) is not None:
+            return count
+        kelas = db.kelas.find_one({"batch_id": batch_id}, {"spots_available": 1}) or {}
+        available = kelas.get('spots_available', 0)
+        if available <= 0:
+            return 0
+        count = min(count, available)
+    return 0
+
+
+def _flush_registrations(db, rows, report):
+    """Tulis pendaftaran; baris yang benar-benar baru mengambil kursi dulu."""
+    if not rows:
+        return
+    existing = {
+        (d['batch_id'], d['email']) for d in db.registrations.find(
+            queries.registrations_by_key({q['batch_id'] for _, q, _ in rows}, {q['email'] for _, q, _ in rows}),
+            {"batch_id": 1, "email": 1})
+    }
+    new_keys = {(q['batch_id'], q['email']) for _, q, _ in rows} - existing
+    seats = {batch_id: take_seats(db, batch_id, count)
+             for batch_id, count in Counter(b for b, _ in new_keys).items()}
+
+    left = dict(seats)
+    seen = set()
+    ops, lines, keys = [], [], []
+    for line, query, update in rows:
+        key = (query['batch_id'], query['email'])
+        if key in new_keys and key not in seen:
+            if not left[key[0]]:
+                report.error(line, f"kelas batch '{key[0]}' sudah penuh")
+                continue
+            left[key[0]] -= 1
+            seen.add(key)
+        ops.append(UpdateOne(query, update, upsert=True))
+        lines.append(line)
+        keys.append((query['batch_id'], update['$setOnInsert']['status']))
+
+    inserted = []
+    try:
+        inserted = [keys[i] for i in _flush(db.registrations, ops, lines, report)]
+    finally:
+        # Juga saat bulk_write gagal total (AutoReconnect, timeout, ...): kursi yang
+        # diambil tapi tidak jadi dipakai (gagal ditulis / didahului request lain) dikembalikan
+        rows.clear()
+        used = Counter(batch_id for batch_id, _ in inserted)
+        for batch_id, taken in seats.items():
+            if taken > used[batch_id]:
+                db.kelas.update_one({"batch_id": batch_id}, {"$inc": {"spots_available": taken - used[batch_id]}})
+        batch_stats.record_registrations(db, inserted)
+
+
+def import_csv(db, stream, kind, batch_size=BULK_BATCH_SIZE):
+    """Import CSV ``kind`` ('kelas' atau 'registrations') dari stream biner."""
+    report = ImportReport(kind)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    columns = KELAS_COLUMNS if kind == 'kelas' else REGISTRATION_COLUMNS
+    missing = [c for c in columns[:3] if c not in (reader.fieldnames or [])]
+    if missing:
+        report.error(1, f"header wajib tidak ada: {', '.join(missing)} (kolom: {', '.join(columns)})")
+        return report
+
+    if kind == 'kelas':
+        parse = parse_kelas
+    else:
+        batches = {k['batch_id']: k.get('level') for k in db.kelas.find(
+            {"batch_id": {"$nin": [None, ""]}}, {"batch_id": 1, "level": 1})}
+        parse = lambda row: parse_registration(row, batches)
+
+    rows = []  # (nomor baris, filter, update)
+
+    def flush():
+        if kind == 'kelas':
+            ops = [UpdateOne(query, update, upsert=True) for _, query, update in rows]
+            _flush(db.kelas, ops, [line for line, _, _ in rows], report)
+            rows.clear()
+        else:
+            _flush_registrations(db, rows, report)
+
+    try:
+        for row in reader:
+            report.rows += 1
+            # Nomor baris file (header = baris 1); benar selama tidak ada sel multi-baris
+            line = reader.line_num
+            try:
+                query, update = parse(row)
+            except ValueError as e:
+                report.error(line, str(e))
+                continue
+            rows.append((line, query, update))
+            if len(rows) >= batch_size:
+                flush()
+    except (csv.Error, UnicodeDecodeError) as e:
+        report.error(reader.line_num, f"CSV tidak bisa dibaca: {e}")
+    flush()
+    text.detach()
+    return report
+
+
+def parse_ids(values):
+    """Gabungan input id (dipisah koma/spasi/baris) -> (ObjectId valid, id tidak valid)."""
+    ids, invalid, seen = [], [], set()
+    for value in values:
+        for token in re.split(r'[\s,]+', value or ''):
+            if not token or token in seen:
+                continue
+            seen.add(token)
+            if ObjectId.is_valid(token):
+                ids.append(ObjectId(token))
+            else:
+                invalid.append(token)
+    return ids, invalid
+
+
+def bulk_update_status(db, ids, status, batch_size=BULK_BATCH_SIZE):
+    """Set status banyak pendaftaran sekaligus, lintas batch.
+
+    Return (jumlah diupdate, jumlah sudah berstatus itu, id yang tidak ditemukan).
+    """
+    if status not in REGISTRATION_STATUSES:
+        raise ValueError(f"status harus salah satu dari {', '.join(REGISTRATION_STATUSES)}")
+    modified = matched = 0
+    not_found = []
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        chunk_modified, chunk_matched = batch_stats.set_status(db, queries.registrations_by_id(chunk), status)
+        modified += chunk_modified
+        matched += chunk_matched
+        if chunk_matched < len(chunk):
+            found = {d['_id'] for d in db.registrations.find(queries.registrations_by_id(chunk), {"_id": 1})}
+            not_found.extend(str(i) for i in chunk if i not in found)
+    return modified, matched - modified, not_found
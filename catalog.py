@@ -0,0 +1,108 @@
+"""Cache katalog kelas untuk halaman publik.
+
+Katalog hanya berubah lewat admin_kelas dan pendaftaran, jadi seluruh
+``db.kelas`` dimuat sekali per TTL dan semua tampilan publik (beranda,
+/kelas, /daftar, detail) diturunkan dari salinan di memori. Setiap
+penulisan memanggil ``invalidate()``. Dengan ``CATALOG_CHANGE_STREAM=1``
+tiap worker juga mendengarkan change stream MongoDB (butuh replica set)
+supaya perubahan dari worker lain langsung terlihat.
+"""
+import itertools
+import os
+import threading
+from datetime import datetime
+
+import queries
+from cache import TTLCache
+
+CATALOG_TTL = int(os.getenv('CATALOG_CACHE_TTL', 60))
+CHANGE_STREAM = os.getenv('CATALOG_CHANGE_STREAM') == '1'
+
+_cache = TTLCache(CATALOG_TTL)
+_versions = itertools.count(1)
+_watcher_pid = None
+
+
+# Urutan sama dengan keyset /api/kelas, supaya halaman pertama /kelas bisa disambung dari API
+CATALOG_SORT = queries.KELAS_SORT
+
+
+def _load(db):
+    return _build(list(db.kelas.find().sort(CATALOG_SORT)))
+
+
+def _build(classes):
+    return {
+        "all": classes,
+        "by_id": {str(k["_id"]): k for k in classes},
+        # Berubah setiap katalog dimuat ulang (invalidate maupun TTL habis)
+        "version": next(_versions),
+        "loaded_at": datetime.utcnow(),
+    }
+
+
+def _catalog(db):
+    if CHANGE_STREAM:
+        _ensure_watcher(db)
+    return _cache.get_or_load("catalog", lambda: _load(db))
+
+
+def all_classes(db):
+    return _catalog(db)["all"]
+
+
+def featured_classes(db, limit=3):
+    """Kelas upcoming/ongoing terdekat untuk beranda."""
+    return [k for k in all_classes(db) if k.get("status") in ("upcoming", "ongoing")][:limit]
+
+
+def available_classes(db):
+    """Kelas upcoming yang masih punya kursi (pilihan di /daftar)."""
+    return [k for k in all_classes(db) if k.get("status") == "upcoming" and k.get("spots_available", 0) > 0]
+
+
+def get_class(db, kelas_id):
+    return _catalog(db)["by_id"].get(str(kelas_id))
+
+
+def version(db):
+    """(versi, waktu dimuat) salinan katalog yang sedang dipakai."""
+    data = _catalog(db)
+    return data["version"], data["loaded_at"]
+
+
+async def warm_async(adb):
+    """Mode ASGI: muat katalog lewat AsyncMongoClient kalau cache sedang kosong.
+
+    Setelah ini fungsi sync di atas melayani dari memori tanpa I/O.
+    """
+    if "catalog" not in _cache:
+        classes = await adb.kelas.find().sort(CATALOG_SORT).to_list(None)
+        _cache.set("catalog", _build(classes))
+
+
+def invalidate():
+    _cache.invalidate()
+
+
+def stats():
+    return _cache.stats()
+
+
+def _ensure_watcher(db):
+    # Thread tidak ikut ter-fork, jadi cek per proses
+    global _watcher_pid
+    if _watcher_pid == os.getpid():
+        return
+    _watcher_pid = os.getpid()
+    threading.Thread(target=_watch, args=(db,), name="catalog-watch", daemon=True).start()
+
+
+def _watch(db):
+    try:
+        with db.kelas.watch() as stream:
+            for _change in stream:
+                invalidate()
+    except Exception as e:
+        # Standalone mongod tidak mendukung change stream; TTL tetap berlaku
+        print(f"Catalog change stream error: {e}")
@@ -0,0 +1,36 @@
+# Konfigurasi gunicorn: gunicorn -c gunicorn.conf.py app:app
+import multiprocessing
+import os
+import time
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+# Aman di-preload: MongoClient baru dibuat di tiap worker setelah fork (mongo.py)
+preload_app = True
+
+
+def when_ready(server):
+    # Dengan preload_app modul app sudah di-import oleh master sebelum fork
+    import app
+    server.log.info("App import: %.1f ms", app.IMPORT_SECONDS * 1000)
+
+
+def child_exit(server, worker):
+    # Metrik multiprocess (PROMETHEUS_MULTIPROC_DIR, lihat metrics.py) milik worker yang mati
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+
+
+def post_worker_init(worker):
+    # Cold start worker yang sebenarnya (fork -> siap), dilaporkan di /health/ready
+    import app
+    app.WORKER_BOOT_SECONDS = time.perf_counter() - worker.forked_at
+    worker.log.info("Worker boot: %.1f ms", app.WORKER_BOOT_SECONDS * 1000)
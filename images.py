@@ -0,0 +1,88 @@
+"""Varian gambar kelas (thumbnail kartu, ukuran detail, WebP).
+
+Varian dibuat sekali saat admin upload, lalu disimpan di GridFS bersama
+file original dengan ``metadata.parent`` menunjuk ke id original.
+"""
+import io
+
+from bson.objectid import ObjectId
+
+# Nama varian -> lebar maksimum (px)
+IMAGE_SIZES = {
+    'card': 480,
+    'detail': 960,
+}
+IMAGE_FORMATS = {
+    'jpeg': {'content_type': 'image/jpeg', 'ext': 'jpg', 'save': {'quality': 82, 'optimize': True, 'progressive': True}},
+    'webp': {'content_type': 'image/webp', 'ext': 'webp', 'save': {'quality': 78, 'method': 4}},
+}
+
+
+def store_image(fs, file_storage):
+    """Simpan upload + semua varian. Return (id original, {varian: lebar})."""
+    data = file_storage.read()
+    original_id = fs.put(data, filename=file_storage.filename, content_type=file_storage.content_type)
+    try:
+        variants = _put_variants(fs, original_id, file_storage.filename, data)
+    except Exception as e:
+        # File tetap tersimpan, hanya tanpa varian (template fallback ke original)
+        print(f"Image variant error: {e}")
+        variants = {}
+    return original_id, variants
+
+
+def _put_variants(fs, original_id, filename, data):
+    # Pillow cukup berat; hanya diimport saat admin benar-benar upload
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    stem = (filename or 'image').rsplit('.', 1)[0]
+
+    variants = {}
+    for size, max_width in IMAGE_SIZES.items():
+        resized = image.copy()
+        # Hanya perkecil, jangan pernah memperbesar
+        resized.thumbnail((max_width, max_width * 4), Image.LANCZOS)
+        for fmt, opts in IMAGE_FORMATS.items():
+            if fmt == 'jpeg':
+                frame = _flatten(resized) if has_alpha else resized.convert('RGB')
+            else:
+                frame = resized.convert('RGBA' if has_alpha else 'RGB')
+            buf = io.BytesIO()
+            frame.save(buf, format=fmt.upper(), **opts['save'])
+            fs.put(
+                buf.getvalue(),
+                filename=f"{stem}-{size}.{opts['ext']}",
+                content_type=opts['content_type'],
+                metadata={'parent': original_id, 'size': size, 'format': fmt, 'width': resized.width},
+            )
+        variants[size] = resized.width
+    return variants
+
+
+def _flatten(image):
+    from PIL import Image
+
+    # JPEG tidak punya alpha: tempel di atas background putih
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+    return background
+
+
+def variant_query(image_id, size, fmt='jpeg'):
+    return {'metadata.parent': ObjectId(image_id), 'metadata.size': size, 'metadata.format': fmt}
+
+
+def find_variant(fs, image_id, size, fmt='jpeg'):
+    """GridOut varian, atau None kalau gambar lama belum punya varian."""
+    return fs.find_one(variant_query(image_id, size, fmt))
+
+
+def delete_image(fs, image_id):
+    """Hapus file original beserta semua variannya."""
+    oid = ObjectId(image_id)
+    for variant in list(fs.find({'metadata.parent': oid})):
+        fs.delete(variant._id)
+    fs.delete(oid)
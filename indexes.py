@@ -0,0 +1,163 @@
+"""Bootstrap index MongoDB untuk genkan_institute.
+
+Index dideklarasikan di INDEXES dan diberi nomor versi. Aplikasi
+menjalankan ``ensure_indexes`` sekali per proses saat pertama kali
+terkoneksi; kalau versi di ``db.schema_meta`` sudah sama, tidak ada yang
+dikerjakan. Bisa juga dijalankan manual::
+
+    python indexes.py            # buat / upgrade index
+    python indexes.py --check    # explain() query tiap route, gagal kalau ada COLLSCAN
+"""
+import sys
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, IndexModel
+
+# Naikkan setiap kali INDEXES berubah
+SCHEMA_VERSION = 4
+
+INDEXES = {
+    "kelas": [
+        # Katalog publik & admin: urut start_date
+        IndexModel([("start_date", ASCENDING), ("_id", ASCENDING)], name="start_date_id"),
+        IndexModel([("status", ASCENDING), ("start_date", ASCENDING)], name="status_start_date"),
+        # reserve_seat: level + status (equality), urut start_date, lalu spots (range)
+        IndexModel([("level", ASCENDING), ("status", ASCENDING), ("start_date", ASCENDING), ("spots_available", ASCENDING)],
+                   name="level_status_start_date_spots"),
+        IndexModel([("batch_id", ASCENDING)], name="batch_id"),
+    ],
+    "registrations": [
+        # Ringkasan per batch (covered: cukup batch_id + status)
+        IndexModel([("batch_id", ASCENDING), ("status", ASCENDING)], name="batch_id_status"),
+        # Daftar siswa per batch & export
+        IndexModel([("batch_id", ASCENDING), ("tanggal", ASCENDING), ("_id", ASCENDING)], name="batch_id_tanggal_id"),
+        # Upsert import CSV (bulk.py): satu pendaftaran per email per batch
+        IndexModel([("batch_id", ASCENDING), ("email", ASCENDING)], name="batch_id_email"),
+    ],
+    "placement_questions": [
+        # Bank soal aktif, urut order (placement.py)
+        IndexModel([("active", ASCENDING), ("order", ASCENDING), ("_id", ASCENDING)], name="active_order_id"),
+        IndexModel([("code", ASCENDING)], name="code_unique", unique=True),
+    ],
+    "admins": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "kontak": [
+        # Outbox mail_worker.py
+        IndexModel([("mail_status", ASCENDING), ("next_attempt_at", ASCENDING)], name="mail_status_next_attempt"),
+        IndexModel([("mail_status", ASCENDING), ("locked_at", ASCENDING)], name="mail_status_locked_at"),
+    ],
+    "login_attempts": [
+        # Counter login_guard.py (backend mongo), dihapus otomatis setelah expires_at
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "fs.files": [
+        # Varian gambar (images.py)
+        IndexModel([("metadata.parent", ASCENDING), ("metadata.size", ASCENDING), ("metadata.format", ASCENDING)],
+                   name="variant_parent_size_format"),
+    ],
+}
+
+
+def ensure_indexes(db, force=False):
+    """Buat index yang belum ada. Idempotent; return True kalau ada yang dikerjakan."""
+    meta = db.schema_meta.find_one({"_id": "indexes"}) or {}
+    if not force and meta.get("version", 0) >= SCHEMA_VERSION:
+        return False
+    for collection, models in INDEXES.items():
+        db[collection].create_indexes(models)
+    db.schema_meta.update_one(
+        {"_id": "indexes"},
+        {"$set": {"version": SCHEMA_VERSION, "applied_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    print(f"Index schema v{SCHEMA_VERSION} diterapkan")
+    return True
+
+
+def query_plans():
+    """Query panas per route: (nama, koleksi, filter atau pipeline, sort).
+
+    Dibangun dari helper yang sama dengan yang dipakai route (queries.py,
+    batch_stats, images), jadi explain() selalu atas query yang sebenarnya.
+    """
+    import batch_stats
+    import queries
+    from images import variant_query
+    from kelas_api import encode_cursor, parse_args
+
+    api_after, _, _ = parse_args({"cursor": encode_cursor({"start_date": "2026-01-01", "_id": ObjectId()})})
+    api_status, _, _ = parse_args({"status": "upcoming"})
+    lookup = next(stage["$lookup"] for stage in batch_stats.summary_pipeline() if "$lookup" in stage)
+    return [
+        ("catalog (index/kelas/daftar/detail)", "kelas", {}, queries.KELAS_SORT),
+        ("admin_kelas", "kelas", {}, queries.KELAS_SORT),
+        ("api_kelas (cursor)", "kelas", api_after, queries.KELAS_SORT),
+        ("api_kelas ?status=", "kelas", api_status, queries.KELAS_SORT),
+        ("daftar reserve_seat", "kelas", queries.open_seat("A1-A"), queries.KELAS_SORT),
+        ("admin_laporan batch_stats", "batch_stats", batch_stats.summary_pipeline(), None),
+        ("batch_stats --check", "registrations", batch_stats.counts_pipeline(), None),
+        ("laporan $lookup kelas", "kelas", {lookup["foreignField"]: "2025-01"}, None),
+        ("admin_laporan_siswa", "registrations", queries.batch_registrations("2025-01"), queries.SISWA_SORT),
+        ("admin_export_laporan", "registrations", queries.export_query({"status": "pending"}), queries.EXPORT_SORT),
+        ("admin_update_status", "registrations", queries.batch_registrations("2025-01"), None),
+        ("admin_import pendaftaran", "registrations",
+         queries.registrations_by_key(["2025-01"], ["siswa@example.com"]), None),
+        ("admin_bulk_status", "registrations", queries.registrations_by_id([ObjectId()]), None),
+        ("placement answer_key", "placement_questions", queries.ACTIVE_QUESTIONS, queries.QUESTION_SORT),
+        ("admin_login / load_user", "admins", queries.admin_by_username("admin"), None),
+        ("serve_image varian", "fs.files", variant_query(ObjectId(), "card", "webp"), None),
+        ("mail_worker claim", "kontak", queries.mail_claim(datetime.utcnow(), 600), queries.MAIL_CLAIM_SORT),
+    ]
+
+
+def _plan_stages(node, inside_winning=False):
+    """Semua nama stage di dalam winningPlan (format classic maupun SBE)."""
+    stages = []
+    if isinstance(node, dict):
+        if inside_winning and "stage" in node:
+            stages.append(node["stage"])
+        for key, value in node.items():
+            if key == "rejectedPlans":
+                continue
+            stages += _plan_stages(value, inside_winning or key == "winningPlan")
+    elif isinstance(node, list):
+        for value in node:
+            stages += _plan_stages(value, inside_winning)
+    return stages
+
+
+def explain(db, collection, spec, sort=None):
+    if isinstance(spec, list):
+        result = db.command("explain", {"aggregate": collection, "pipeline": spec, "cursor": {}},
+                            verbosity="queryPlanner")
+    else:
+        cursor = db[collection].find(spec)
+        if sort:
+            cursor = cursor.sort(sort)
+        result = cursor.explain()
+    return _plan_stages(result)
+
+
+def check_query_plans(db):
+    """Return list (nama, stages) untuk query yang memakai COLLSCAN."""
+    failures = []
+    for name, collection, spec, sort in query_plans():
+        stages = explain(db, collection, spec, sort)
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"{status:9} {name}: {' > '.join(stages)}")
+        if status != "ok":
+            failures.append((name, stages))
+    return failures
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    from mongo import mongo
+
+    load_dotenv()
+    db = mongo.db
+    if '--check' in sys.argv[1:]:
+        sys.exit(1 if check_query_plans(db) else 0)
+    ensure_indexes(db, force=True)
@@ -0,0 +1,121 @@
+"""JSON katalog kelas (/api/kelas): keyset pagination, filter, projection.
+
+Halaman diurutkan (start_date, _id) dan halaman berikutnya diminta dengan
+``cursor`` dari response sebelumnya, jadi setiap request hanya membaca
+``limit`` dokumen lewat index ``start_date_id`` (atau index level/status),
+berapa pun jumlah batch lama di katalog. Tidak ada skip/offset.
+
+Parameter query:
+
+- ``level``, ``status``: filter, boleh beberapa nilai dipisah koma
+- ``fields``: field yang dikirim (default tanpa ``description``)
+- ``limit``: jumlah per halaman (default ``API_PAGE_SIZE``, maks ``API_MAX_PAGE_SIZE``)
+- ``cursor``: token ``next_cursor`` dari halaman sebelumnya
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+import queries
+
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 12))
+API_MAX_PAGE_SIZE = 50
+GZIP_MIN_BYTES = 1024
+FIELDS = ('level', 'title', 'description', 'status', 'start_date', 'schedule', 'batch_id',
+          'prerequisite_level', 'price', 'spots_available', 'image_id', 'image_variants')
+DEFAULT_FIELDS = tuple(f for f in FIELDS if f != 'description')
+
+
+def _split(value):
+    return [v.strip() for v in (value or '').split(',') if v.strip()]
+
+
+def encode_cursor(doc):
+    start_date = doc.get('start_date')
+    if isinstance(start_date, datetime):
+        key = ['d', start_date.isoformat()]
+    else:
+        key = ['s', start_date]
+    raw = json.dumps(key + [str(doc['_id'])], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Token -> (start_date, ObjectId). ValueError kalau token rusak."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        kind, start_date, kelas_id = json.loads(raw)
+        if kind == 'd':
+            start_date = datetime.fromisoformat(start_date)
+        return start_date, ObjectId(kelas_id)
+    except Exception:
+        raise ValueError("cursor tidak valid")
+
+
+def parse_args(args):
+    """Query string -> (filter, fields, limit). ValueError untuk parameter yang salah."""
+    query = {}
+    for name in ('level', 'status'):
+        values = _split(args.get(name))
+        if len(values) == 1:
+            query[name] = values[0]
+        elif values:
+            query[name] = {"$in": values}
+
+    fields = _split(args.get('fields')) or list(DEFAULT_FIELDS)
+    unknown = [f for f in fields if f not in FIELDS and f != '_id']
+    if unknown:
+        raise ValueError(f"field tidak dikenal: {', '.join(unknown)} (pilihan: {', '.join(FIELDS)})")
+
+    try:
+        limit = int(args.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit harus angka")
+    limit = min(max(limit, 1), API_MAX_PAGE_SIZE)
+
+    if args.get('cursor'):
+        query.update(queries.kelas_after(*decode_cursor(args['cursor'])))
+    return query, fields, limit
+
+
+def fetch_page(db, query, fields, limit):
+    """(dokumen, next_cursor) satu halaman, urut (start_date, _id)."""
+    # start_date selalu diambil untuk cursor; tidak dikirim kalau tidak diminta
+    projection = dict.fromkeys(set(fields) | {'start_date'}, 1)
+    if 'image_id' in fields:
+        projection['image_variants'] = 1  # untuk image_url
+    docs = list(db.kelas.find(query, projection).sort(queries.KELAS_SORT).limit(limit + 1))
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+def serialize(doc, fields, url_for):
+    item = {"_id": str(doc['_id'])}
+    for name in fields:
+        if name in doc and name != '_id':
+            value = doc[name]
+            if isinstance(value, ObjectId):
+                value = str(value)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            item[name] = value
+    item['detail_url'] = url_for('kelas_detail', kelas_id=item['_id'])
+    if doc.get('image_id'):
+        size = 'card' if 'card' in (doc.get('image_variants') or {}) else None
+        item['image_url'] = url_for('serve_image', image_id=str(doc['image_id']), size=size)
+    return item
+
+
+def encode_json(payload):
+    """JSON compact -> (body, etag). ETag dihitung dari JSON asli, sebelum gzip."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return body, hashlib.md5(body).hexdigest()
+
+
+def gzip_body(body):
+    return gzip.compress(body, compresslevel=6, mtime=0)
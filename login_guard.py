@@ -0,0 +1,155 @@
+"""Pelindung CPU untuk /admin/login.
+
+Percobaan login dibatasi per IP dan per username dengan token bucket
+*sebelum* bcrypt dijalankan, jadi tebakan beruntun tidak bisa menghabiskan
+CPU worker. Verifikasi bcrypt sendiri dijalankan di thread pool kecil
+dengan antrian terbatas; username yang tidak ada tetap dicek terhadap hash
+dummy supaya waktu responsnya sama.
+
+Bucket disimpan di memori proses (default) atau di MongoDB
+(``LOGIN_GUARD_BACKEND=mongo``) supaya batasnya berlaku lintas worker;
+dokumen ``login_attempts`` dibersihkan oleh TTL index (lihat indexes.py).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import bcrypt
+from pymongo import ReturnDocument
+
+
+class MemoryBuckets:
+    """Token bucket per key, disimpan di memori proses."""
+
+    def __init__(self, burst, per_minute, maxkeys=10000):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.maxkeys = maxkeys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxkeys:
+                self._buckets.popitem(last=False)
+        return allowed
+
+
+class MongoBuckets:
+    """Counter fixed-window per menit di db.login_attempts, berlaku lintas worker."""
+
+    def __init__(self, db, burst, per_minute):
+        self.db = db
+        self.limit = max(burst, per_minute)
+
+    def take(self, key):
+        now = datetime.utcnow()
+        window = now.replace(second=0, microsecond=0)
+        doc = self.db.login_attempts.find_one_and_update(
+            {"_id": f"{key}:{window:%Y%m%d%H%M}"},
+            {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": window + timedelta(minutes=2)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["count"] <= self.limit
+
+
+class LoginGuard:
+    def __init__(self, ip_buckets, user_buckets, max_concurrent=2, max_pending=8):
+        self.ip_buckets = ip_buckets
+        self.user_buckets = user_buckets
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._dummy_hash = None
+        self._lock = threading.Lock()
+        self.rejected = {"ip": 0, "username": 0, "busy": 0}
+        self.verify_count = 0
+        self.verify_seconds = 0.0
+        self.verify_max_seconds = 0.0
+
+    def allow(self, ip, username):
+        """False kalau IP atau username sudah melewati batas percobaan."""
+        if not self.ip_buckets.take(f"ip:{ip}"):
+            self._reject("ip")
+            return False
+        if not self.user_buckets.take(f"user:{username.lower()}"):
+            self._reject("username")
+            return False
+        return True
+
+    def _reject(self, reason):
+        with self._lock:
+            self.rejected[reason] += 1
+
+    def verify(self, password, hashed):
+        """True/False hasil bcrypt, atau None kalau antrian verifikasi penuh.
+
+        hashed=None (username tidak ada) dicek terhadap hash dummy supaya
+        waktunya sama dengan username yang ada.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._reject("busy")
+            return None
+        try:
+            if hashed is None:
+                hashed = self._dummy()
+                password_ok = False
+            else:
+                password_ok = True
+            started = time.perf_counter()
+            matched = self._executor.submit(bcrypt.checkpw, password, hashed).result()
+            elapsed = time.perf_counter() - started
+        finally:
+            self._slots.release()
+        with self._lock:
+            self.verify_count += 1
+            self.verify_seconds += elapsed
+            self.verify_max_seconds = max(self.verify_max_seconds, elapsed)
+        return matched and password_ok
+
+    def _dummy(self):
+        if self._dummy_hash is None:
+            self._dummy_hash = bcrypt.hashpw(os.urandom(16), bcrypt.gensalt())
+        return self._dummy_hash
+
+    def stats(self):
+        return {
+            "rejected": dict(self.rejected),
+            "verify_count": self.verify_count,
+            "verify_avg_ms": round(self.verify_seconds / self.verify_count * 1000, 1) if self.verify_count else 0.0,
+            "verify_max_ms": round(self.verify_max_seconds * 1000, 1),
+        }
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def create_login_guard(db):
+    ip_burst = _env_int('LOGIN_IP_BURST', 10)
+    ip_per_minute = _env_int('LOGIN_IP_PER_MINUTE', 10)
+    user_burst = _env_int('LOGIN_USER_BURST', 5)
+    user_per_minute = _env_int('LOGIN_USER_PER_MINUTE', 5)
+    if os.getenv('LOGIN_GUARD_BACKEND') == 'mongo':
+        ip_buckets = MongoBuckets(db, ip_burst, ip_per_minute)
+        user_buckets = MongoBuckets(db, user_burst, user_per_minute)
+    else:
+        ip_buckets = MemoryBuckets(ip_burst, ip_per_minute)
+        user_buckets = MemoryBuckets(user_burst, user_per_minute)
+    return LoginGuard(
+        ip_buckets,
+        user_buckets,
+        max_concurrent=_env_int('LOGIN_MAX_CONCURRENT', 2),
+        max_pending=_env_int('LOGIN_MAX_PENDING', 8),
+    )
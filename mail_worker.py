@@ -0,0 +1,227 @@
+"""Worker outbox email untuk form kontak.
+
+Route /kontak hanya menyimpan pesan ke ``db.kontak`` dengan
+``mail_status: "pending"``; worker ini yang mengirim email-nya, di luar
+request web. Jalankan sebagai proses terpisah::
+
+    python mail_worker.py          # loop terus
+    python mail_worker.py --once   # kuras outbox sekali lalu keluar
+
+Uji lokal tanpa Gmail pakai SMTP stand-in, misalnya aiosmtpd::
+
+    python -m aiosmtpd -n -l localhost:8025
+    SMTP_HOST=localhost SMTP_PORT=8025 SMTP_STARTTLS=0 python mail_worker.py --once
+
+Dengan ``MAIL_WORKER_METRICS_PORT`` worker membuka endpoint Prometheus
+sendiri (durasi SMTP dan command Mongo) di ``MAIL_WORKER_METRICS_ADDR``
+(default 127.0.0.1).
+
+Pesan yang gagal dikirim (error apa pun) kembali ke ``pending`` dengan
+backoff, atau ``failed`` setelah ``MAIL_MAX_ATTEMPTS``; ``mail_error``
+menyimpan penyebabnya. Klaim ``sending`` dari worker yang mati diambil
+ulang setelah ``MAIL_LEASE_SECONDS`` (default 600).
+"""
+import os
+import random
+import smtplib
+import sys
+import time
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+
+import metrics
+import queries
+from mongo import mongo
+
+load_dotenv()
+
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') != '0'
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', 30))
+
+EMAIL_USERNAME = os.getenv('EMAIL_USERNAME')
+EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
+EMAIL_RECIPIENT = os.getenv('EMAIL_RECIPIENT')
+
+BATCH_SIZE = int(os.getenv('MAIL_BATCH_SIZE', 20))
+MAX_ATTEMPTS = int(os.getenv('MAIL_MAX_ATTEMPTS', 5))
+POLL_INTERVAL = float(os.getenv('MAIL_POLL_INTERVAL', 5))
+BACKOFF_BASE = 30          # detik, dikali 2^percobaan
+BACKOFF_MAX = 3600
+# Klaim 'sending' yang lebih lama dari ini dianggap worker mati dan diambil ulang
+LEASE_SECONDS = int(os.getenv('MAIL_LEASE_SECONDS', 600))
+
+
+class Mailer:
+    """Satu koneksi SMTP terautentikasi yang dipakai ulang antar pesan."""
+
+    def __init__(self):
+        self.server = None
+
+    def connection(self):
+        if self.server is not None:
+            try:
+                self.server.noop()
+                return self.server
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        if SMTP_STARTTLS:
+            server.starttls()
+        if EMAIL_USERNAME and EMAIL_PASSWORD:
+            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
+        self.server = server
+        return server
+
+    def send(self, msg):
+        with metrics.timed('smtp'):
+            self.connection().sendmail(msg['From'], [msg['To']], msg.as_string())
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+
+def build_message(doc):
+    msg = MIMEMultipart()
+    msg['From'] = EMAIL_USERNAME
+    msg['To'] = EMAIL_RECIPIENT
+    msg['Subject'] = f"New Contact Form Submission from {doc.get('nama')}"
+    body = f"""
+    New message from contact form:
+    Name: {doc.get('nama')}
+    Email: {doc.get('email')}
+    Message: {doc.get('pesan')}
+    Submitted on: {doc['tanggal'].strftime('%Y-%m-%d %H:%M:%S')}
+    """
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(db, limit=BATCH_SIZE):
+    """Klaim sampai `limit` pesan pending secara atomik (aman untuk banyak worker)."""
+    batch = []
+    while len(batch) < limit:
+        now = datetime.utcnow()
+        doc = db.kontak.find_one_and_update(
+            queries.mail_claim(now, LEASE_SECONDS),
+            {"$set": {"mail_status": "sending", "locked_at": now}},
+            sort=queries.MAIL_CLAIM_SORT,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            break
+        batch.append(doc)
+    return batch
+
+
+def mark_failed(db, doc, error):
+    attempts = doc.get('mail_attempts', 0) + 1
+    update = {"mail_attempts": attempts, "mail_error": str(error), "locked_at": None}
+    if attempts >= MAX_ATTEMPTS:
+        update["mail_status"] = "failed"
+    else:
+        update["mail_status"] = "pending"
+        update["next_attempt_at"] = datetime.utcnow() + backoff(attempts)
+    db.kontak.update_one({"_id": doc["_id"]}, {"$set": update})
+
+
+def _connection_failed(db, mailer, rest, error):
+    print(f"SMTP connection error: {error}")
+    mailer.close()
+    for doc in rest:
+        mark_failed(db, doc, error)
+
+
+def process_batch(db, mailer, batch):
+    """Kirim satu batch lewat koneksi yang sama. Return jumlah terkirim."""
+    sent = 0
+    for i, doc in enumerate(batch):
+        try:
+            mailer.send(build_message(doc))
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPAuthenticationError) as e:
+            # Masalah koneksi, bukan pesannya: kembalikan sisa batch ke antrian
+            _connection_failed(db, mailer, batch[i:], e)
+            break
+        except smtplib.SMTPException as e:
+            # SMTPException turunan OSError, jadi harus dicek sebelum OSError:
+            # penolakan satu pesan tidak boleh ikut menggagalkan sisa batch
+            print(f"Kirim email kontak {doc['_id']} gagal: {e}")
+            mark_failed(db, doc, e)
+            continue
+        except OSError as e:
+            # Socket putus/timeout/DNS
+            _connection_failed(db, mailer, batch[i:], e)
+            break
+        except Exception as e:
+            # Pesan rusak (field hilang, encoding, dll.): jangan biarkan tertahan di 'sending'
+            print(f"Kirim email kontak {doc['_id']} error: {e!r}")
+            mark_failed(db, doc, e)
+            continue
+        db.kontak.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"mail_status": "sent", "sent_at": datetime.utcnow(), "locked_at": None, "mail_error": None},
+             "$inc": {"mail_attempts": 1}},
+        )
+        sent += 1
+    return sent
+
+
+def drain(db, mailer):
+    """Kuras outbox sampai tidak ada pesan yang jatuh tempo."""
+    total = 0
+    while True:
+        batch = claim_batch(db)
+        if not batch:
+            return total
+        total += process_batch(db, mailer, batch)
+
+
+def main(argv):
+    if not all([EMAIL_USERNAME, EMAIL_RECIPIENT]):
+        print("Warning: One or more email configuration variables are missing!")
+    metrics_port = os.getenv('MAIL_WORKER_METRICS_PORT')
+    if metrics_port:
+        # Histogram SMTP (genkan_dependency_duration_seconds) dan command Mongo untuk di-scrape
+        from prometheus_client import start_http_server
+        metrics.register_mongo_listener()
+        start_http_server(int(metrics_port), addr=os.getenv('MAIL_WORKER_METRICS_ADDR', '127.0.0.1'))
+    db = mongo.db
+    mailer = Mailer()
+    try:
+        while True:
+            try:
+                sent = drain(db, mailer)
+            except Exception as e:
+                # Mis. Mongo sempat putus; klaim yang tertinggal diambil ulang setelah LEASE_SECONDS
+                print(f"Outbox error: {e!r}")
+                sent = 0
+                if '--once' in argv:
+                    raise
+            if sent:
+                print(f"Outbox: {sent} email terkirim")
+            if '--once' in argv:
+                break
+            # Tutup koneksi saat idle supaya tidak diputus server di tengah jalan
+            mailer.close()
+            time.sleep(POLL_INTERVAL)
+    finally:
+        mailer.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
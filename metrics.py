@@ -0,0 +1,240 @@
+"""Instrumentasi request: waktu per route, command MongoDB, GridFS dan SMTP.
+
+Setiap request mendapat ``RequestTimings`` (disimpan di contextvar). Command
+listener pymongo menambahkan jumlah dan durasi setiap command Mongo ke
+request yang sedang berjalan, dan ``timed('gridfs')``/``timed('smtp')``
+mencatat blok kode lain. Hasilnya:
+
+- header ``Server-Timing`` (app, mongo, gridfs, smtp) di setiap response;
+- histogram Prometheus per route di ``/metrics`` (termasuk jumlah command
+  Mongo per request, supaya pola N+1 langsung kelihatan);
+- log JSON ``slow_request`` untuk request di atas ``SLOW_REQUEST_MS``.
+
+Gunicorn menjalankan beberapa worker; set ``PROMETHEUS_MULTIPROC_DIR`` ke
+direktori kosong supaya /metrics menggabungkan angka semua worker
+(gunicorn.conf.py membersihkan data worker yang mati).
+
+/metrics mati (404) sampai dikonfigurasi: ``METRICS_TOKEN`` mengizinkan
+request dengan header ``Authorization: Bearer <token>``, dan/atau
+``METRICS_ALLOWED_IPS`` (dipisah koma) mengizinkan IP scraper tertentu.
+"""
+import contextvars
+import json
+import logging
+import os
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import Response, abort, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter as PromCounter, Histogram, generate_latest
+from pymongo import monitoring
+
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 500))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_ALLOWED_IPS = {ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()}
+
+logger = logging.getLogger('genkan.requests')
+
+REQUEST_SECONDS = Histogram(
+    'genkan_request_duration_seconds', 'Durasi request per route',
+    ['method', 'route'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUESTS = PromCounter('genkan_requests_total', 'Jumlah request per route dan status', ['method', 'route', 'status'])
+REQUEST_MONGO_COMMANDS = Histogram(
+    'genkan_request_mongo_commands', 'Jumlah command MongoDB per request',
+    ['method', 'route'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500),
+)
+REQUEST_MONGO_SECONDS = Histogram(
+    'genkan_request_mongo_seconds', 'Total waktu MongoDB per request',
+    ['method', 'route'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    'genkan_mongo_command_duration_seconds', 'Durasi command MongoDB',
+    ['command', 'outcome'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+DEPENDENCY_SECONDS = Histogram(
+    'genkan_dependency_duration_seconds', 'Durasi panggilan GridFS/SMTP',
+    ['dependency', 'outcome'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.mongo_seconds = 0.0
+        self.mongo_commands = Counter()
+        self.spans = Counter()  # dependency -> detik
+
+    def server_timing(self):
+        parts = [f"app;dur={(time.perf_counter() - self.started) * 1000:.1f}"]
+        count = sum(self.mongo_commands.values())
+        if count:
+            parts.append(f'mongo;dur={self.mongo_seconds * 1000:.1f};desc="{count} cmd"')
+        for name, seconds in sorted(self.spans.items()):
+            parts.append(f"{name};dur={seconds * 1000:.1f}")
+        return ', '.join(parts)
+
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def timed(dependency):
+    """Catat durasi blok sebagai span ``dependency`` (gridfs, smtp, ...)."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        elapsed = time.perf_counter() - started
+        DEPENDENCY_SECONDS.labels(dependency, outcome).observe(elapsed)
+        timings = _current.get()
+        if timings is not None:
+            timings.spans[dependency] += elapsed
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Atribusikan setiap command Mongo ke request yang sedang berjalan.
+
+    Event pymongo sync dipublikasikan di thread yang menjalankan command,
+    jadi contextvar request aktif ikut terlihat di sini.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, 'ok')
+
+    def failed(self, event):
+        self._record(event, 'error')
+
+    def _record(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_SECONDS.labels(event.command_name, outcome).observe(seconds)
+        timings = _current.get()
+        if timings is not None:
+            timings.mongo_seconds += seconds
+            timings.mongo_commands[event.command_name] += 1
+
+
+def _route():
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def _before_request():
+    _current.set(RequestTimings())
+
+
+def _after_request(response):
+    timings = _current.get()
+    if timings is None:
+        return response
+    # Response streaming (export, gambar): header dikirim sebelum body, jadi
+    # Server-Timing hanya mencakup sampai titik ini. Metrik & log dicatat
+    # setelah body selesai dikirim (call_on_close).
+    response.headers['Server-Timing'] = timings.server_timing()
+    method, route, path, status = request.method, _route(), request.full_path.rstrip('?'), response.status_code
+    response.call_on_close(lambda: _finish(timings, method, route, path, status))
+    return response
+
+
+def _finish(timings, method, route, path, status):
+    elapsed = time.perf_counter() - timings.started
+    commands = sum(timings.mongo_commands.values())
+    REQUEST_SECONDS.labels(method, route).observe(elapsed)
+    REQUESTS.labels(method, route, str(status)).inc()
+    REQUEST_MONGO_COMMANDS.labels(method, route).observe(commands)
+    REQUEST_MONGO_SECONDS.labels(method, route).observe(timings.mongo_seconds)
+    if _current.get() is timings:
+        _current.set(None)
+    if elapsed * 1000 >= SLOW_REQUEST_MS:
+        logger.warning(json.dumps({
+            "event": "slow_request",
+            "method": method,
+            "route": route,
+            "path": path,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 1),
+            "mongo_ms": round(timings.mongo_seconds * 1000, 1),
+            "mongo_commands": dict(timings.mongo_commands),
+            "spans_ms": {k: round(v * 1000, 1) for k, v in timings.spans.items()},
+            "pid": os.getpid(),
+        }))
+
+
+def log_error(error):
+    """Log JSON untuk exception yang berakhir jadi 500."""
+    timings = _current.get()
+    logger.error(json.dumps({
+        "event": "unhandled_error",
+        "method": request.method,
+        "route": _route(),
+        "path": request.full_path.rstrip('?'),
+        "error": repr(error),
+        "mongo_commands": dict(timings.mongo_commands) if timings else {},
+        "traceback": ''.join(traceback.format_exception(error)) if isinstance(error, BaseException) else None,
+        "pid": os.getpid(),
+    }))
+
+
+_listener_registered = False
+
+
+def register_mongo_listener():
+    """Daftarkan MongoCommandListener sekali per proses.
+
+    Harus sebelum MongoClient pertama dibuat (mongo.py membuatnya lazy).
+    """
+    global _listener_registered
+    if not _listener_registered:
+        monitoring.register(MongoCommandListener())
+        _listener_registered = True
+
+
+def metrics_view():
+    if not (METRICS_TOKEN or METRICS_ALLOWED_IPS):
+        abort(404)
+    token_ok = bool(METRICS_TOKEN) and request.headers.get('Authorization') == f"Bearer {METRICS_TOKEN}"
+    if not token_ok and request.remote_addr not in METRICS_ALLOWED_IPS:
+        abort(401 if METRICS_TOKEN else 403)
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        data = generate_latest(registry)
+    else:
+        data = generate_latest()
+    return Response(data, mimetype=CONTENT_TYPE_LATEST)
+
+
+def setup_logging():
+    """Log JSON satu baris per event ke stderr (kalau belum dikonfigurasi)."""
+    root = logging.getLogger('genkan')
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        root.propagate = False
+
+
+def init_app(app):
+    register_mongo_listener()
+    setup_logging()
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,99 @@
+"""Koneksi MongoDB per proses.
+
+MongoClient tidak aman dipakai bersama lintas fork, jadi client baru dibuat
+lazy di proses yang pertama kali memakainya (setelah gunicorn fork worker),
+bukan saat import. ``db`` dan ``fs`` adalah proxy ke koneksi proses aktif,
+sehingga kode lain cukup memakai ``db.kelas`` seperti biasa.
+
+Ukuran pool dan timeout diatur lewat environment:
+MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS,
+MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS,
+MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS. Nama database bisa diganti
+lewat MONGO_DB_NAME (dipakai benchmark.py supaya tidak menyentuh data asli).
+"""
+import os
+import threading
+
+from gridfs import GridFS
+from pymongo import MongoClient
+from werkzeug.local import LocalProxy
+
+DB_NAME = os.getenv('MONGO_DB_NAME', 'genkan_institute')
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def client_options():
+    return {
+        'maxPoolSize': _env_int('MONGO_MAX_POOL_SIZE', 50),
+        'minPoolSize': _env_int('MONGO_MIN_POOL_SIZE', 0),
+        'maxIdleTimeMS': _env_int('MONGO_MAX_IDLE_TIME_MS', 300000),
+        'waitQueueTimeoutMS': _env_int('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000),
+        'serverSelectionTimeoutMS': _env_int('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000),
+        'connectTimeoutMS': _env_int('MONGO_CONNECT_TIMEOUT_MS', 5000),
+        'socketTimeoutMS': _env_int('MONGO_SOCKET_TIMEOUT_MS', 30000),
+    }
+
+
+class MongoManager:
+    def __init__(self, uri=None):
+        self.uri = uri
+        self._pid = None
+        self._client = None
+        self._fs = None
+        self._lock = threading.Lock()
+        self._on_connect = []
+
+    def on_connect(self, func):
+        """Daftarkan fungsi(db) yang dijalankan sekali setiap proses terkoneksi."""
+        self._on_connect.append(func)
+        return func
+
+    def _connect(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return False
+            # Client warisan dari proses induk sengaja tidak di-close di sini:
+            # socket-nya milik proses induk.
+            self._client = MongoClient(self.uri or os.getenv('MONGO_URI'), **client_options())
+            self._fs = GridFS(self._client[DB_NAME])
+            self._pid = os.getpid()
+            return True
+
+    @property
+    def client(self):
+        if self._pid != os.getpid() and self._connect():
+            for func in self._on_connect:
+                try:
+                    func(self._client[DB_NAME])
+                except Exception as e:
+                    print(f"Mongo on_connect error ({func.__name__}): {e}")
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[DB_NAME]
+
+    @property
+    def fs(self):
+        self.client
+        return self._fs
+
+    def ping(self):
+        self.client.admin.command('ping')
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._fs = None
+            self._pid = None
+
+
+mongo = MongoManager()
+db = LocalProxy(lambda: mongo.db)
+fs = LocalProxy(lambda: mongo.fs)
@@ -0,0 +1,79 @@
+"""Cache HTML hasil render untuk halaman publik, dengan ETag dan 304.
+
+Halaman yang bergantung pada katalog memakai versi katalog sebagai bagian
+key, jadi setiap ``catalog.invalidate()`` (admin_kelas, daftar) atau
+katalog dimuat ulang otomatis membuat entri lama tidak terpakai lagi.
+Request yang masih membawa flash message selalu di-render biasa.
+"""
+import hashlib
+import os
+from datetime import datetime
+from functools import wraps
+
+from flask import g, make_response, message_flashed, request, session
+
+import catalog
+from cache import TTLCache
+
+PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', 300))
+
+_pages = TTLCache(PAGE_CACHE_TTL, maxsize=256)
+# Halaman statis hanya berubah kalau template berubah, yaitu saat deploy/restart
+_started_at = datetime.utcnow().replace(microsecond=0)
+
+
+@message_flashed.connect
+def _flashed(sender, **extra):
+    # Dipanggil di request yang memanggil flash(); template sudah mengambil
+    # (pop) pesannya dari session sebelum wrapper sempat memeriksa
+    g._page_flashed = True
+
+
+def cached_page(db=None):
+    """Decorator view GET. Berikan `db` kalau halaman bergantung pada katalog."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Flash dari request sebelumnya ditampilkan sekali, jangan di-cache
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            if db is not None:
+                try:
+                    version, last_modified = catalog.version(db)
+                except Exception as e:
+                    # Database bermasalah: biarkan view menangani (flash error) tanpa cache
+                    print(f"Page cache error: {e}")
+                    return view(*args, **kwargs)
+            else:
+                version, last_modified = None, _started_at
+            key = (request.path, request.query_string, version)
+
+            entry = _pages.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                # Jangan simpan halaman error atau yang baru saja menambah flash
+                if response.status_code != 200 or g.get('_page_flashed') or session.get('_flashes'):
+                    return response
+                body = response.get_data()
+                entry = {
+                    "body": body,
+                    "mimetype": response.mimetype,
+                    "etag": hashlib.md5(body).hexdigest(),
+                    "last_modified": last_modified.replace(microsecond=0),
+                }
+                _pages.set(key, entry)
+
+            response = make_response(entry["body"])
+            response.mimetype = entry["mimetype"]
+            response.set_etag(entry["etag"])
+            response.last_modified = entry["last_modified"]
+            # Browser boleh simpan, tapi wajib revalidasi (murah: 304)
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def stats():
+    return _pages.stats()
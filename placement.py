@@ -0,0 +1,230 @@
+"""Placement test: bank soal di MongoDB, kunci jawaban NumPy, skor vektor.
+
+Bank soal (``db.placement_questions``) dimuat sekali per TTL menjadi
+``AnswerKey``: array kunci jawaban dan bobot, jadi menilai satu submission
+cukup satu perbandingan array. Skor (0-100) dipetakan ke level JLPT
+N5-N1 lewat ``PLACEMENT_THRESHOLDS``, lalu ke level kelas Genkan untuk
+mencari batch yang masih buka di katalog.
+
+Setiap submission disimpan di ``db.placement_attempts`` (jawaban per id
+soal), sehingga semua percobaan bisa dinilai ulang kalau bank soal atau
+threshold berubah::
+
+    python placement.py --load-bank placement_questions.sample.json
+    python placement.py --regrade            # nilai ulang & simpan
+    python placement.py --regrade --dry-run  # hanya tampilkan perubahan
+
+Format soal: ``{"code", "order", "section", "text", "choices": [...],
+"answer": <index pilihan benar>, "weight": 1, "active": true}``.
+"""
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+from pymongo import UpdateOne
+
+import queries
+from cache import TTLCache
+
+PLACEMENT_CACHE_TTL = int(os.getenv('PLACEMENT_CACHE_TTL', 300))
+JLPT_LEVELS = ['N5', 'N4', 'N3', 'N2', 'N1']
+# Skor minimum (0-100) untuk N4, N3, N2, N1; di bawah threshold pertama = N5
+THRESHOLDS = [float(t) for t in os.getenv('PLACEMENT_THRESHOLDS', '35,55,70,85').split(',')]
+# Level JLPT -> level kelas yang cocok (kelas tertinggi kami A2-2B)
+JLPT_CLASS_LEVELS = {
+    'N5': ['A1-A', 'A1-C'],
+    'N4': ['A2-1B', 'A2-2B'],
+    'N3': ['A2-2B'],
+    'N2': ['A2-2B'],
+    'N1': ['A2-2B'],
+}
+REGRADE_BATCH_SIZE = 5000
+UNANSWERED = -1
+
+_cache = TTLCache(PLACEMENT_CACHE_TTL)
+
+
+class AnswerKey:
+    """Bank soal aktif dalam bentuk array (urutan = field ``order``)."""
+
+    def __init__(self, questions):
+        self.ids = [str(q['_id']) for q in questions]
+        self.position = {qid: i for i, qid in enumerate(self.ids)}
+        self.answers = np.array([q['answer'] for q in questions], dtype=np.int8)
+        self.weights = np.array([q.get('weight', 1) for q in questions], dtype=np.float64)
+        self.choice_counts = [len(q['choices']) for q in questions]
+        self.total_weight = float(self.weights.sum())
+        # Yang dibutuhkan template saja (tanpa kunci jawaban)
+        self.questions = [
+            {"id": qid, "section": q.get('section'), "text": q['text'], "choices": q['choices']}
+            for qid, q in zip(self.ids, questions)
+        ]
+        digest = hashlib.sha1()
+        for qid, answer, weight in zip(self.ids, self.answers.tolist(), self.weights.tolist()):
+            digest.update(f"{qid}:{answer}:{weight};".encode())
+        self.version = digest.hexdigest()[:12]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _choice(self, i, value):
+        """Index pilihan yang valid untuk soal ke-i, atau UNANSWERED."""
+        try:
+            choice = int(value)
+        except (TypeError, ValueError):
+            return UNANSWERED
+        return choice if 0 <= choice < self.choice_counts[i] else UNANSWERED
+
+    def responses_from_form(self, form):
+        """Jawaban form (field ``q_<id>`` = index pilihan) -> array int8."""
+        responses = np.full(len(self), UNANSWERED, dtype=np.int8)
+        for i, qid in enumerate(self.ids):
+            value = form.get(f"q_{qid}")
+            if value is not None:
+                responses[i] = self._choice(i, value)
+        return responses
+
+    def responses_from_attempt(self, answers):
+        """Jawaban tersimpan {id soal: pilihan} -> array int8 (soal yang sudah dihapus diabaikan)."""
+        responses = np.full(len(self), UNANSWERED, dtype=np.int8)
+        for qid, choice in answers.items():
+            i = self.position.get(qid)
+            if i is not None:
+                responses[i] = self._choice(i, choice)
+        return responses
+
+    def scores(self, responses):
+        """Skor 0-100 untuk satu jawaban (1-D) atau banyak sekaligus (2-D, satu baris per attempt)."""
+        if not self.total_weight:
+            return np.zeros(responses.shape[:-1])
+        return (responses == self.answers) @ self.weights / self.total_weight * 100
+
+
+def levels_for(scores, thresholds=None):
+    """Skor (skalar atau array) -> level JLPT."""
+    index = np.searchsorted(np.asarray(thresholds or THRESHOLDS), scores, side='right')
+    if np.ndim(index) == 0:
+        return JLPT_LEVELS[int(index)]
+    return [JLPT_LEVELS[i] for i in index]
+
+
+def _load(db):
+    questions = list(db.placement_questions.find(
+        queries.ACTIVE_QUESTIONS,
+        {"text": 1, "choices": 1, "answer": 1, "weight": 1, "section": 1, "order": 1},
+    ).sort(queries.QUESTION_SORT))
+    return AnswerKey(questions)
+
+
+def answer_key(db):
+    return _cache.get_or_load("key", lambda: _load(db))
+
+
+def invalidate():
+    _cache.invalidate()
+
+
+def grade(key, responses):
+    """(skor dibulatkan, level JLPT) untuk satu submission."""
+    score = float(np.round(key.scores(responses), 1))
+    return score, levels_for(score)
+
+
+def matching_classes(classes, level):
+    """Batch yang masih buka (dari catalog.available_classes) untuk level JLPT ini."""
+    wanted = JLPT_CLASS_LEVELS.get(level, [])
+    return [k for k in classes if k.get('level') in wanted]
+
+
+def attempt_document(key, responses, score, level, nama=None, email=None):
+    return {
+        "nama": nama,
+        "email": email,
+        "answers": {qid: int(choice) for qid, choice in zip(key.ids, responses.tolist()) if choice != UNANSWERED},
+        "score": score,
+        "level": level,
+        "key_version": key.version,
+        "thresholds": THRESHOLDS,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def regrade(db, dry_run=False, batch_size=REGRADE_BATCH_SIZE):
+    """Nilai ulang semua attempt dengan kunci & threshold saat ini.
+
+    Return (jumlah attempt, jumlah yang skor/levelnya berubah).
+    """
+    key = _load(db)
+    total = changed = 0
+    cursor = db.placement_attempts.find({}, {"answers": 1, "score": 1, "level": 1}).batch_size(batch_size)
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            changed += _regrade_batch(db, key, batch, dry_run)
+            total += len(batch)
+            batch = []
+    if batch:
+        changed += _regrade_batch(db, key, batch, dry_run)
+        total += len(batch)
+    return total, changed
+
+
+def _regrade_batch(db, key, docs, dry_run):
+    # Satu matriks (attempt x soal), satu perkalian untuk seluruh batch
+    matrix = np.stack([key.responses_from_attempt(d.get('answers', {})) for d in docs]) if len(key) else \
+        np.empty((len(docs), 0), dtype=np.int8)
+    scores = np.round(key.scores(matrix), 1)
+    levels = levels_for(scores)
+    now = datetime.utcnow()
+    ops = []
+    for doc, score, level in zip(docs, scores.tolist(), levels):
+        if doc.get('score') == score and doc.get('level') == level:
+            continue
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {
+            "score": score,
+            "level": level,
+            "key_version": key.version,
+            "thresholds": THRESHOLDS,
+            "regraded_at": now,
+        }}))
+    if ops and not dry_run:
+        db.placement_attempts.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def load_bank(db, path):
+    """Ganti bank soal dengan isi file JSON (list soal)."""
+    with open(path, encoding='utf-8') as f:
+        questions = json.load(f)
+    for i, q in enumerate(questions):
+        if not q.get('text') or not q.get('choices') or not 0 <= int(q.get('answer', -1)) < len(q['choices']):
+            raise ValueError(f"Soal #{i + 1} tidak valid (butuh text, choices, answer = index pilihan)")
+        q.setdefault('code', f"q{i}")
+        q.setdefault('order', i)
+        q.setdefault('active', True)
+    ops = [UpdateOne({"code": q['code']}, {"$set": q}, upsert=True) for q in questions]
+    db.placement_questions.bulk_write(ops, ordered=False)
+    codes = [q['code'] for q in questions]
+    # Soal lama yang tidak ada di file dinonaktifkan, bukan dihapus (attempt lama tetap bisa dibaca)
+    db.placement_questions.update_many({"code": {"$nin": codes}}, {"$set": {"active": False}})
+    return len(questions)
+
+
+def main(argv):
+    from mongo import mongo
+    db = mongo.db
+    if '--load-bank' in argv:
+        count = load_bank(db, argv[argv.index('--load-bank') + 1])
+        print(f"{count} soal dimuat ke placement_questions")
+    if '--regrade' in argv:
+        dry_run = '--dry-run' in argv
+        total, changed = regrade(db, dry_run=dry_run)
+        print(f"{total} attempt dinilai ulang, {changed} berubah" + (" (dry run, tidak disimpan)" if dry_run else ""))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -10,6 +10,10 @@ REM --- Jalankan Tailwind (watch mode) ---
 echo 🔧 Menjalankan Tailwind CSS Compiler...
 start cmd /k "npx tailwindcss -i ./static/css/input.css -o ./static/css/output.css --watch"
 
+REM --- Build asset statis (hash, WebP) ---
+echo Membangun asset statis...
+python build_assets.py
+
 REM --- Jalankan server Flask ---
 echo Menjalankan Flask server...
 python app.py
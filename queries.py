@@ -0,0 +1,71 @@
+"""Filter & sort query panas, dipakai bersama oleh route dan ``indexes.py --check``.
+
+Route membangun query lewat fungsi di sini, dan ``indexes.query_plans()``
+menjalankan explain() atas query yang sama persis, jadi cek index tidak bisa
+ketinggalan dari query yang benar-benar dijalankan.
+"""
+from datetime import datetime, timedelta
+
+# Katalog publik, admin_kelas, /api/kelas dan reserve_seat: batch paling awal dulu
+KELAS_SORT = [("start_date", 1), ("_id", 1)]
+SISWA_SORT = [("tanggal", 1), ("_id", 1)]
+EXPORT_SORT = [("batch_id", 1), ("tanggal", 1)]
+QUESTION_SORT = [("order", 1), ("_id", 1)]
+MAIL_CLAIM_SORT = [("next_attempt_at", 1)]
+
+ACTIVE_QUESTIONS = {"active": True}
+
+
+def open_seat(level):
+    """Kelas upcoming dengan level ini yang masih punya kursi (reserve_seat)."""
+    return {"level": level, "status": "upcoming", "spots_available": {"$gt": 0}}
+
+
+def kelas_after(start_date, kelas_id):
+    """Keyset: kelas sesudah (start_date, _id) dalam urutan KELAS_SORT."""
+    return {"$or": [
+        {"start_date": {"$gt": start_date}},
+        {"start_date": start_date, "_id": {"$gt": kelas_id}},
+    ]}
+
+
+def batch_registrations(batch_id):
+    return {"batch_id": batch_id}
+
+
+def registrations_by_id(ids):
+    return {"_id": {"$in": list(ids)}}
+
+
+def registrations_by_key(batch_ids, emails):
+    """Pendaftaran yang mungkin sudah ada untuk pasangan (batch_id, email) import CSV."""
+    return {"batch_id": {"$in": list(batch_ids)}, "email": {"$in": list(emails)}}
+
+
+def export_query(args):
+    """Query registrations dari filter batch/status/tanggal. ValueError kalau tanggal salah."""
+    query = {}
+    if args.get('batch_id'):
+        query['batch_id'] = args['batch_id']
+    if args.get('status'):
+        query['status'] = args['status']
+    tanggal = {}
+    if args.get('date_from'):
+        tanggal['$gte'] = datetime.strptime(args['date_from'], '%Y-%m-%d')
+    if args.get('date_to'):
+        tanggal['$lt'] = datetime.strptime(args['date_to'], '%Y-%m-%d') + timedelta(days=1)
+    if tanggal:
+        query['tanggal'] = tanggal
+    return query
+
+
+def admin_by_username(username):
+    return {"username": username}
+
+
+def mail_claim(now, lease_seconds):
+    """Pesan kontak yang jatuh tempo, atau klaim 'sending' yang sudah kedaluwarsa."""
+    return {"$or": [
+        {"mail_status": "pending", "next_attempt_at": {"$lte": now}},
+        {"mail_status": "sending", "locked_at": {"$lt": now - timedelta(seconds=lease_seconds)}},
+    ]}
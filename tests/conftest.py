@@ -0,0 +1,44 @@
+"""Fixture database untuk test.
+
+Dengan ``MONGO_TEST_URI`` test memakai MongoDB sungguhan (database
+sementara ``genkan_test``, dihapus setelah tiap test); tanpa itu memakai
+mongomock in-process.
+
+    pip install -r requirment-dev.text
+    MONGO_TEST_URI=mongodb://localhost:27017 python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongo as mongo_module  # noqa: E402
+
+TEST_DB_NAME = 'genkan_test'
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "mongo: butuh perilaku server MongoDB; pakai MONGO_TEST_URI supaya tidak jalan di mongomock")
+
+
+@pytest.fixture
+def db(monkeypatch):
+    uri = os.getenv('MONGO_TEST_URI')
+    if not uri:
+        import mongomock
+        import mongomock.gridfs
+        mongomock.gridfs.enable_gridfs_integration()
+        client = mongomock.MongoClient()
+        monkeypatch.setattr(mongo_module, 'MongoClient', lambda *args, **kwargs: client)
+    monkeypatch.setattr(mongo_module, 'DB_NAME', TEST_DB_NAME)
+    manager = mongo_module.mongo
+    manager.close()
+    manager.uri = uri
+    database = manager.db
+    database.client.drop_database(TEST_DB_NAME)
+    yield database
+    database.client.drop_database(TEST_DB_NAME)
+    manager.close()
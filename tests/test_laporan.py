@@ -0,0 +1,63 @@
+"""Laporan & export admin setelah satu pendaftaran baru (batch_stats baru dibuat)."""
+import csv
+import io
+
+import pytest
+
+import app as genkan_app
+import catalog
+
+
+@pytest.fixture
+def admin_client(db):
+    admin_id = db.admins.insert_one({"username": "admin", "password": "x"}).inserted_id
+    catalog.invalidate()
+    genkan_app.user_cache.invalidate()
+    client = genkan_app.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin_id)
+        session['_fresh'] = True
+    return client
+
+
+def _daftar_once(db, client):
+    db.kelas.insert_one({"level": "A1-A", "title": "Kelas T1", "status": "upcoming", "start_date": "2026-01-05",
+                         "spots_available": 5, "batch_id": "T1"})
+    catalog.invalidate()
+    response = client.post('/daftar', data={"nama": "Siswa", "email": "siswa@example.com",
+                                            "whatsapp": "", "level": "A1-A"})
+    assert response.status_code == 302
+    assert db.registrations.count_documents({"batch_id": "T1"}) == 1
+
+
+def test_export_after_single_daftar(db, admin_client):
+    _daftar_once(db, admin_client)
+
+    response = admin_client.get('/admin/export_laporan')
+
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 2
+    assert rows[1][:4] == ["T1", "1", "1", "0"]
+    assert rows[1][5] == "1/5"
+
+
+def test_laporan_after_single_daftar(db, admin_client):
+    _daftar_once(db, admin_client)
+
+    item, = genkan_app.laporan_summary()
+
+    assert (item['total_pendaftar'], item['pending'], item['completed']) == (1, 1, 0)
+    page = admin_client.get('/admin/laporan').get_data(as_text=True)
+    assert "<strong>Completed:</strong> 0" in page
+
+
+def test_missing_counter_is_drift(db):
+    import batch_stats
+
+    db.registrations.insert_one({"batch_id": "T1", "status": "pending"})
+    db.batch_stats.insert_one({"_id": "T1", "total_pendaftar": 1, "pending": 1})
+
+    assert [batch_id for batch_id, _, _ in batch_stats.diff(db)] == ["T1"]
+    batch_stats.rebuild(db)
+    assert batch_stats.diff(db) == []
@@ -0,0 +1,85 @@
+"""Outbox mail_worker terhadap SMTP stand-in lokal (aiosmtpd)."""
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+
+import mail_worker
+
+controller_module = pytest.importorskip("aiosmtpd.controller")
+
+
+class Inbox:
+    """Handler aiosmtpd: tolak pesan yang subjeknya berisi REJECT, simpan sisanya."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        if b"REJECT" in envelope.content:
+            return "550 5.7.1 Message rejected"
+        self.messages.append(envelope.content)
+        return "250 OK"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    inbox = Inbox()
+    controller = controller_module.Controller(inbox, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    monkeypatch.setattr(mail_worker, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(mail_worker, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(mail_worker, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(mail_worker, "SMTP_TIMEOUT", 5)
+    monkeypatch.setattr(mail_worker, "EMAIL_USERNAME", "outbox@example.com")
+    monkeypatch.setattr(mail_worker, "EMAIL_PASSWORD", None)
+    monkeypatch.setattr(mail_worker, "EMAIL_RECIPIENT", "admin@example.com")
+    yield inbox
+    controller.stop()
+
+
+def _outbox(db, names):
+    due = datetime.utcnow() - timedelta(minutes=1)
+    db.kontak.insert_many([
+        {"nama": name, "email": f"{name.lower()}@example.com", "pesan": "Halo", "tanggal": due,
+         "mail_status": "pending", "next_attempt_at": due + timedelta(seconds=i)}
+        for i, name in enumerate(names)
+    ])
+
+
+def _statuses(db):
+    return {doc["nama"]: (doc["mail_status"], doc.get("mail_attempts", 0))
+            for doc in db.kontak.find()}
+
+
+def test_rejected_message_does_not_fail_rest_of_batch(db, smtp):
+    _outbox(db, ["A", "REJECT", "C", "D", "E"])
+    mailer = mail_worker.Mailer()
+    try:
+        sent = mail_worker.drain(db, mailer)
+    finally:
+        mailer.close()
+
+    assert sent == 4
+    assert len(smtp.messages) == 4
+    statuses = _statuses(db)
+    assert statuses.pop("REJECT") == ("pending", 1)
+    assert set(statuses.values()) == {("sent", 1)}
+    assert "550" in db.kontak.find_one({"nama": "REJECT"})["mail_error"]
+
+
+def test_connection_error_returns_batch_to_queue(db, monkeypatch):
+    monkeypatch.setattr(mail_worker, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(mail_worker, "SMTP_PORT", _free_port())  # tidak ada yang listen
+    monkeypatch.setattr(mail_worker, "SMTP_TIMEOUT", 5)
+    _outbox(db, ["A", "B"])
+
+    assert mail_worker.drain(db, mail_worker.Mailer()) == 0
+    assert set(_statuses(db).values()) == {("pending", 1)}
+    assert db.kontak.count_documents({"mail_status": "sending"}) == 0
@@ -0,0 +1,76 @@
+"""Stress test reserve_seat: ratusan pendaftar paralel berebut kursi terakhir.
+
+Tanpa ``MONGO_TEST_URI`` test jalan di mongomock, yang tidak menguji
+atomicity di sisi server. Jalankan terhadap MongoDB sungguhan::
+
+    MONGO_TEST_URI=mongodb://localhost:27017 python -m pytest -m mongo tests
+"""
+import threading
+
+import pytest
+
+import app as genkan_app
+
+THREADS = 300
+
+pytestmark = pytest.mark.mongo
+
+
+def _kelas(batch_id, start_date, spots):
+    return {"level": "A1-A", "title": f"Kelas {batch_id}", "status": "upcoming",
+            "start_date": start_date, "spots_available": spots, "batch_id": batch_id}
+
+
+def _race(db, threads):
+    """Jalankan reserve_seat dari banyak thread sekaligus. Return (hasil, sisa kursi terkecil yang terlihat)."""
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+    lowest = []
+    done = threading.Event()
+
+    def register(i):
+        barrier.wait()
+        results[i] = genkan_app.reserve_seat("A1-A", {
+            "nama": f"Siswa {i}", "email": f"siswa{i}@example.com", "whatsapp": "",
+            "level": "A1-A", "status": "pending",
+        })
+
+    def watch():
+        # Sisa kursi dipantau selama balapan, bukan hanya di akhir
+        while not done.is_set():
+            lowest.append(min(k["spots_available"] for k in db.kelas.find({}, {"spots_available": 1})))
+
+    watcher = threading.Thread(target=watch)
+    workers = [threading.Thread(target=register, args=(i,)) for i in range(threads)]
+    watcher.start()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    done.set()
+    watcher.join()
+    return results, min(lowest)
+
+
+@pytest.mark.parametrize("seats", [1, 3, 10])
+def test_last_seats_are_never_oversold(db, seats):
+    db.kelas.insert_one(_kelas("T1", "2026-01-05", seats))
+
+    results, lowest = _race(db, THREADS)
+
+    assert sum(r is not None for r in results) == seats
+    assert lowest >= 0
+    assert db.kelas.find_one({"batch_id": "T1"})["spots_available"] == 0
+    assert db.registrations.count_documents({"batch_id": "T1"}) == seats
+
+
+def test_full_batch_falls_through_to_next_batch(db):
+    db.kelas.insert_many([_kelas("T1", "2026-01-05", 2), _kelas("T2", "2026-02-02", 3)])
+
+    results, lowest = _race(db, THREADS)
+
+    assert sum(r is not None for r in results) == 5
+    assert lowest >= 0
+    assert [k["spots_available"] for k in db.kelas.find().sort("start_date", 1)] == [0, 0]
+    assert db.registrations.count_documents({"batch_id": "T1"}) == 2
+    assert db.registrations.count_documents({"batch_id": "T2"}) == 3